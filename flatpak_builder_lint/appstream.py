@@ -1,8 +1,12 @@
 import os
 import subprocess
-from typing import TypedDict, cast
+from typing import TYPE_CHECKING, TypedDict, cast
 
-from lxml import etree
+from . import profiling
+
+# lxml is only needed to parse files, not for appstreamcli validation
+if TYPE_CHECKING:
+    from lxml import etree
 
 
 class SubprocessResult(TypedDict):
@@ -43,11 +47,12 @@ def validate(path: str, *args: str) -> SubprocessResult:
 
     overrides_value = ",".join([f"{k}={v}" for k, v in overrides.items()])
 
-    cmd = subprocess.run(
-        ["appstreamcli", "validate", f"--override={overrides_value}", *args, path],
-        capture_output=True,
-        check=False,
-    )
+    with profiling.subprocess_call():
+        cmd = subprocess.run(
+            ["appstreamcli", "validate", f"--override={overrides_value}", *args, path],
+            capture_output=True,
+            check=False,
+        )
 
     ret: SubprocessResult = {
         "stdout": cmd.stdout.decode("utf-8"),
@@ -58,7 +63,9 @@ def validate(path: str, *args: str) -> SubprocessResult:
     return ret
 
 
-def parse_xml(path: str) -> etree._ElementTree:
+def parse_xml(path: str) -> "etree._ElementTree":
+    from lxml import etree
+
     if not (os.path.exists(path) and os.path.isfile(path)):
         raise FileNotFoundError(f"XML file not found: {path}")
 
@@ -68,12 +75,12 @@ def parse_xml(path: str) -> etree._ElementTree:
         raise RuntimeError(f"XML syntax error in file {path}: {e!s}") from None
 
 
-def components(path: str) -> list[etree._Element]:
-    return cast(list[etree._Element], parse_xml(path).xpath("/components/component"))
+def components(path: str) -> list["etree._Element"]:
+    return cast(list["etree._Element"], parse_xml(path).xpath("/components/component"))
 
 
-def metainfo_components(path: str) -> list[etree._Element]:
-    return cast(list[etree._Element], parse_xml(path).xpath("/component"))
+def metainfo_components(path: str) -> list["etree._Element"]:
+    return cast(list["etree._Element"], parse_xml(path).xpath("/component"))
 
 
 def appstream_id(path: str) -> str | None:
@@ -2,20 +2,80 @@ import errno
 import json
 import os
 from collections import defaultdict
+from collections.abc import Iterable, Iterator, Mapping
+from functools import lru_cache
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any
 
-from gi.repository import GLib
+if TYPE_CHECKING:
+    from gi.repository import GLib
 
 
-def parse_metadata(builddir: str) -> dict:
+# Read only permissions or environment of a metadata file. A missing key
+# is empty, like with the defaultdict the checks were written against.
+class FrozenSets(Mapping[str, frozenset[str]]):
+    def __init__(self, values: Mapping[str, Iterable[str]]) -> None:
+        self._values = {key: frozenset(value) for key, value in values.items()}
+
+    def __getitem__(self, key: str) -> frozenset[str]:
+        return self._values.get(key, frozenset())
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._values
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __repr__(self) -> str:
+        return f"FrozenSets({self._values!r})"
+
+
+# Parsed metadata is shared by all the checks of a run and across runs,
+# so it cannot be changed
+Metadata = Mapping[str, Any]
+
+
+def parse_metadata(builddir: str) -> Metadata:
     if not os.path.exists(builddir):
         raise OSError(errno.ENOENT, f"No such build directory: {builddir}")
 
     metadata_path = os.path.join(builddir, "metadata")
-    if not os.path.exists(metadata_path):
-        raise OSError(errno.ENOENT, f"No metadata file in build directory: {builddir}")
+    try:
+        st = os.stat(metadata_path)
+    except FileNotFoundError:
+        raise OSError(errno.ENOENT, f"No metadata file in build directory: {builddir}") from None
+
+    key = (os.path.realpath(metadata_path), st.st_ino, st.st_mtime_ns, st.st_size)
+    return _parse_metadata_file(key)
+
+
+# Keyed by path, inode, modification time and size, so that a rewritten
+# metadata file is parsed again
+@lru_cache(maxsize=256)
+def _parse_metadata_file(key: tuple[str, int, int, int]) -> Metadata:
+    from gi.repository import GLib
+
+    key_file = GLib.KeyFile.new()
+    key_file.load_from_file(key[0], GLib.KeyFileFlags.NONE)
+
+    return _parse_key_file(key_file)
+
+
+@lru_cache(maxsize=256)
+def parse_metadata_bytes(data: bytes) -> Metadata:
+    from gi.repository import GLib
 
     key_file = GLib.KeyFile.new()
-    key_file.load_from_file(metadata_path, GLib.KeyFileFlags.NONE)
+    key_file.load_from_bytes(GLib.Bytes.new(data), GLib.KeyFileFlags.NONE)
+
+    return _parse_key_file(key_file)
+
+
+def _parse_key_file(key_file: "GLib.KeyFile") -> Metadata:
+    from gi.repository import GLib
 
     metadata: dict = {}
 
@@ -60,18 +120,18 @@ def parse_metadata(builddir: str) -> dict:
     if "devices" in permissions:
         permissions["device"] = permissions.pop("devices")
 
-    metadata["permissions"] = permissions
+    metadata["permissions"] = FrozenSets(permissions)
 
     if key_file.has_group("Environment"):
         for key in key_file.get_keys("Environment")[0]:
             environment[key] = key_file.get_string_list("Environment", key)
 
-    metadata["environment"] = environment
+    metadata["environment"] = FrozenSets(environment)
 
     if key_file.has_group("Extra Data"):
         metadata["extra-data"] = "yes"
 
-    return metadata
+    return MappingProxyType(metadata)
 
 
 def infer_appid(path: str) -> str | None:
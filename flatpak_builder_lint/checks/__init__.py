@@ -1,28 +1,345 @@
-from typing import ClassVar
+import importlib
+import importlib.metadata
+import threading
+from collections.abc import Container
+from functools import cache
+from typing import TYPE_CHECKING, NamedTuple
 
-from .. import ostree
+if TYPE_CHECKING:
+    from ..ostree import LintRepo
 
-ALL = []
+KIND_METHODS = {
+    "manifest": "check_manifest",
+    "builddir": "check_build",
+    "repo": "check_repo",
+}
 
+# Third party checks register Check subclasses as entry points in the
+# group for each kind they support, e.g. "flatpak_builder_lint.checks.repo"
+PLUGIN_GROUP = "flatpak_builder_lint.checks"
 
-class CheckMeta(type):
-    def __init__(cls, *args, **kwargs) -> None:  # type: ignore
-        super().__init__(*args, **kwargs)
-        if object in cls.__bases__:
-            # Don't register base class
-            return
-        ALL.append(cls)
 
+class CheckInfo(NamedTuple):
+    module: str
+    name: str
+    methods: tuple[str, ...]
+    # IDs the check adds to errors and warnings, "*" ends a pattern
+    ids: tuple[str, ...]
+    # Rough relative cost: 1 only looks at the input, 2 reads small
+    # files, 3 uses the network, 4 runs subprocesses and 5 checks out
+    # larger parts of the OSTree repo
+    cost: int
 
-class Check(metaclass=CheckMeta):
-    warnings: ClassVar[set[str]] = set()
-    errors: ClassVar[set[str]] = set()
-    jsonschema: ClassVar[set[str]] = set()
-    appstream: ClassVar[set[str]] = set()
-    desktopfile: ClassVar[set[str]] = set()
-    info: ClassVar[set[str]] = set()
-    repo_primary_ref: str | None = None
+
+# Static index of the bundled checks. It lets a lint import only the
+# check modules that implement the method for its kind or that emit the
+# selected IDs. Keep it in sync with the modules in this package.
+INDEX = (
+    CheckInfo(
+        "appid",
+        "AppIDCheck",
+        ("check_manifest", "check_build", "check_repo"),
+        (
+            "appid-code-hosting-too-few-components",
+            "appid-component-wrong-syntax",
+            "appid-ends-with-lowercase-desktop",
+            "appid-filename-mismatch",
+            "appid-length-more-than-255-chars",
+            "appid-less-than-3-components",
+            "appid-not-defined",
+            "appid-too-many-components-for-app",
+            "appid-url-check-internal-error",
+            "appid-url-not-reachable",
+            "appid-uses-code-hosting-domain",
+        ),
+        3,
+    ),
+    CheckInfo(
+        "desktop",
+        "DesktopfileCheck",
+        ("check_build", "check_repo"),
+        (
+            "desktop-file-exec-has-flatpak-run",
+            "desktop-file-exec-key-absent",
+            "desktop-file-failed-validation",
+            "desktop-file-icon-key-absent",
+            "desktop-file-icon-key-empty",
+            "desktop-file-icon-key-wrong-value",
+            "desktop-file-icon-not-installed",
+            "desktop-file-is-hidden",
+            "desktop-file-is-nodisplay",
+            "desktop-file-low-quality-category",
+            "desktop-file-not-installed",
+            "desktop-file-terminal-key-not-true",
+            "no-exportable-icon-installed",
+        ),
+        4,
+    ),
+    CheckInfo(
+        "finish_args",
+        "FinishArgsCheck",
+        ("check_manifest", "check_build", "check_repo"),
+        ("finish-args-*",),
+        1,
+    ),
+    CheckInfo(
+        "flathub_json",
+        "FlathubJsonCheck",
+        ("check_manifest", "check_build", "check_repo"),
+        (
+            "flathub-json-automerge-enabled",
+            "flathub-json-eol-rebase-without-message",
+            "flathub-json-excluded-all-arches",
+            "flathub-json-modified-publish-delay",
+            "flathub-json-only-arches-empty",
+            "flathub-json-skip-appstream-check",
+        ),
+        2,
+    ),
+    CheckInfo(
+        "flatmanager",
+        "FlatManagerCheck",
+        ("check_repo",),
+        (
+            "appstream-flathub-manifest-url-not-reachable",
+            "appstream-no-flathub-manifest-key",
+            "flat-manager-branch-repo-mismatch",
+            "flat-manager-no-app-ref-uploaded",
+        ),
+        3,
+    ),
+    CheckInfo(
+        "jsonschema",
+        "JSONSchemaCheck",
+        ("check_manifest",),
+        ("jsonschema-schema-error", "jsonschema-validation-error"),
+        2,
+    ),
+    CheckInfo(
+        "metainfo",
+        "MetainfoCheck",
+        ("check_build", "check_repo"),
+        (
+            "appstream-failed-validation",
+            "appstream-icon-key-no-type",
+            "appstream-id-mismatch-flatpak-id",
+            "appstream-launchable-file-missing",
+            "appstream-metainfo-missing",
+            "appstream-missing-appinfo-file",
+            "appstream-missing-categories",
+            "appstream-missing-developer-name",
+            "appstream-missing-icon-file",
+            "appstream-missing-icon-key",
+            "appstream-missing-project-license",
+            "appstream-multiple-components",
+            "appstream-release-tag-missing-timestamp",
+            "appstream-remote-icon-not-mirrored",
+            "appstream-screenshot-missing-caption",
+            "appstream-unsupported-component-type",
+            "metainfo-launchable-tag-wrong-value",
+            "metainfo-missing-component-tag",
+            "metainfo-missing-component-type",
+            "metainfo-missing-launchable-tag",
+            "no-exportable-icon-installed",
+            "non-png-icon-in-hicolor-size-folder",
+            "non-svg-icon-in-scalable-folder",
+        ),
+        4,
+    ),
+    CheckInfo(
+        "modules",
+        "ModuleCheck",
+        ("check_manifest",),
+        ("manifest-has-bundled-extension", "module-*"),
+        1,
+    ),
+    CheckInfo(
+        "screenshots",
+        "ScreenshotsCheck",
+        ("check_repo",),
+        (
+            "appstream-external-screenshot-url",
+            "appstream-metainfo-missing",
+            "appstream-missing-screenshots",
+            "appstream-screenshots-files-not-found-in-ostree",
+            "appstream-screenshots-not-mirrored-in-ostree",
+            "metainfo-missing-component-tag",
+            "metainfo-missing-screenshots",
+        ),
+        5,
+    ),
+    CheckInfo(
+        "toplevel",
+        "TopLevelCheck",
+        ("check_manifest",),
+        (
+            "external-gitmodule-url-found",
+            "toplevel-cleanup-debug",
+            "toplevel-command-is-path",
+            "toplevel-no-command",
+            "toplevel-no-modules",
+            "toplevel-unnecessary-branch",
+        ),
+        1,
+    ),
+)
+
+
+def _selector_matches(selector: str, name: str, ids: tuple[str, ...]) -> bool:
+    if selector == name:
+        return True
+
+    # An ID prefix selects every check that may emit an ID starting with
+    # it, e.g. "appstream-" or "finish-args-has-nosocket"
+    return any(
+        emitted.startswith(selector) or selector.startswith(emitted.removesuffix("*"))
+        if emitted.endswith("*")
+        else emitted.startswith(selector)
+        for emitted in ids
+    )
+
+
+def is_selected(
+    name: str, ids: tuple[str, ...], only: tuple[str, ...] = (), skip: tuple[str, ...] = ()
+) -> bool:
+    if only and not any(_selector_matches(s, name, ids) for s in only):
+        return False
+    return not any(_selector_matches(s, name, ids) for s in skip)
+
+
+class LintResults:
+    categories = ("errors", "warnings", "jsonschema", "appstream", "desktopfile", "info")
+
+    def __init__(self) -> None:
+        self.errors: set[str] = set()
+        self.warnings: set[str] = set()
+        self.jsonschema: set[str] = set()
+        self.appstream: set[str] = set()
+        self.desktopfile: set[str] = set()
+        self.info: set[str] = set()
+
+    def update(self, other: "LintResults") -> None:
+        for category in self.categories:
+            getattr(self, category).update(getattr(other, category))
+
+    @classmethod
+    def from_dict(cls, results: dict[str, list[str]]) -> "LintResults":
+        lint_results = cls()
+        for category in cls.categories:
+            getattr(lint_results, category).update(results.get(category, ()))
+        return lint_results
+
+    def to_dict(self) -> dict[str, list[str]]:
+        return {
+            category: sorted(values)
+            for category in self.categories
+            if (values := getattr(self, category))
+        }
+
+
+# State of a single lint run. Every check instance of the run shares it,
+# so separate runs never see each other's results. Each check collects
+# its findings separately and the runner merges them into the context.
+class LintContext:
+    def __init__(
+        self, repo_primary_ref: str | None = None, parent: "LintContext | None" = None
+    ) -> None:
+        self.results = LintResults()
+        self.repo_primary_ref = repo_primary_ref
+        # Runs over several refs of a repo share the repo of the parent
+        self.parent = parent
+        self._repos: dict[str, LintRepo] = {}
+        self._lock = threading.Lock()
+
+    def ostree_repo(self, path: str) -> "LintRepo":
+        from .. import ostree
+
+        if self.parent is not None:
+            return self.parent.ostree_repo(path)
+
+        with self._lock:
+            if path not in self._repos:
+                self._repos[path] = ostree.LintRepo(path)
+            return self._repos[path]
+
+    def close(self) -> None:
+        with self._lock:
+            for repo in self._repos.values():
+                repo.close()
+
+
+class Check:
+    # Third party checks can list the IDs they emit like INDEX does, so
+    # that they are skipped when all of them are excepted
+    ids: tuple[str, ...] = ()
+
+    def __init__(self, context: LintContext | None = None) -> None:
+        self.context = context if context is not None else LintContext()
+
+        self.results = LintResults()
+        self.errors = self.results.errors
+        self.warnings = self.results.warnings
+        self.jsonschema = self.results.jsonschema
+        self.appstream = self.results.appstream
+        self.desktopfile = self.results.desktopfile
+        self.info = self.results.info
+        self.repo_primary_ref = self.context.repo_primary_ref
 
     def _populate_ref(self, repo: str) -> None:
         if self.repo_primary_ref is None:
-            self.repo_primary_ref = ostree.get_primary_ref(repo)
+            self.repo_primary_ref = self.context.ostree_repo(repo).primary_ref()
+
+
+# Unknown to the index, so they run last in fail-fast mode
+PLUGIN_COST = 6
+
+_INDEX_BY_NAME = {info.name: info for info in INDEX}
+
+
+def cost(checkclass: type[Check]) -> int:
+    if info := _INDEX_BY_NAME.get(checkclass.__name__):
+        return info.cost
+    return PLUGIN_COST
+
+
+def emitted_ids(checkclass: type[Check]) -> tuple[str, ...]:
+    if info := _INDEX_BY_NAME.get(checkclass.__name__):
+        return info.ids
+    return checkclass.ids
+
+
+# Findings that depend on more than the linted repo, like the state of a
+# flat-manager build, are never cached
+VOLATILE_CHECKS = frozenset({"FlatManagerCheck"})
+
+
+def is_cacheable(checkclass: type[Check]) -> bool:
+    name = checkclass.__name__
+    return name in _INDEX_BY_NAME and name not in VOLATILE_CHECKS
+
+
+def is_excepted(checkclass: type[Check], exceptions: Container[str]) -> bool:
+    # Patterns can emit IDs nobody knows in advance, so a check with a
+    # pattern always runs
+    ids = emitted_ids(checkclass)
+    return bool(ids) and all(not i.endswith("*") and i in exceptions for i in ids)
+
+
+@cache
+def load(
+    kind: str, only: tuple[str, ...] = (), skip: tuple[str, ...] = ()
+) -> tuple[type[Check], ...]:
+    method = KIND_METHODS[kind]
+    classes: list[type[Check]] = [
+        getattr(importlib.import_module(f".{info.module}", __name__), info.name)
+        for info in INDEX
+        if method in info.methods and is_selected(info.name, info.ids, only, skip)
+    ]
+    # Plugins are selected by their entry point name, so that unselected
+    # ones are not imported either
+    classes.extend(
+        entry_point.load()
+        for entry_point in importlib.metadata.entry_points(group=f"{PLUGIN_GROUP}.{kind}")
+        if is_selected(entry_point.name, (), only, skip)
+    )
+    return tuple(classes)
@@ -1,8 +1,7 @@
 import os
 import re
-import tempfile
 
-from .. import builddir, domainutils, ostree
+from .. import builddir, domainutils
 from . import Check
 
 
@@ -110,15 +109,14 @@ class AppIDCheck(Check):
 
     def check_repo(self, path: str) -> None:
         self._populate_ref(path)
+        repo = self.context.ostree_repo(path)
         ref = self.repo_primary_ref
         if not ref:
             return
         appid = ref.split("/")[1]
 
-        with tempfile.TemporaryDirectory() as tmpdir:
-            ostree.extract_subpath(path, ref, "/metadata", tmpdir)
-            metadata = builddir.parse_metadata(tmpdir)
-            if not metadata:
-                return
-            is_extension = metadata.get("type", False) != "application"
-            self._validate(appid, is_extension)
+        metadata = repo.read_metadata(ref)
+        if not metadata:
+            return
+        is_extension = metadata.get("type", False) != "application"
+        self._validate(appid, is_extension)
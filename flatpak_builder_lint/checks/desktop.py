@@ -2,11 +2,10 @@ import glob
 import os
 import re
 import subprocess
-import tempfile
 
 from gi.repository import GLib
 
-from .. import appstream, builddir, ostree
+from .. import appstream, builddir, profiling
 from . import Check
 
 
@@ -72,17 +71,18 @@ class DesktopfileCheck(Check):
 
         for file in desktop_files:
             if os.path.exists(f"{desktopfiles_path}/{file}"):
-                cmd = subprocess.run(
-                    [
-                        "desktop-file-validate",
-                        "--no-hints",
-                        "--no-warn-deprecated",
-                        f"{desktopfiles_path}/{file}",
-                    ],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    check=False,
-                )
+                with profiling.subprocess_call():
+                    cmd = subprocess.run(
+                        [
+                            "desktop-file-validate",
+                            "--no-hints",
+                            "--no-warn-deprecated",
+                            f"{desktopfiles_path}/{file}",
+                        ],
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.STDOUT,
+                        check=False,
+                    )
                 if cmd.returncode != 0:
                     self.errors.add("desktop-file-failed-validation")
                     self.info.add(
@@ -239,6 +239,7 @@ class DesktopfileCheck(Check):
 
     def check_repo(self, path: str) -> None:
         self._populate_ref(path)
+        repo = self.context.ostree_repo(path)
         ref = self.repo_primary_ref
         if not ref:
             return
@@ -247,20 +248,10 @@ class DesktopfileCheck(Check):
         if appid.endswith(".BaseApp"):
             return
 
-        with tempfile.TemporaryDirectory() as tmpdir:
-            ostree.extract_subpath(path, ref, "/metadata", tmpdir)
-            metadata = builddir.parse_metadata(tmpdir)
-            if not metadata:
-                return
-            if metadata.get("type", False) != "application":
-                return
-
-            dirs_needed = ("app-info", "applications", "icons")
-
-            for subdir in dirs_needed:
-                os.makedirs(os.path.join(tmpdir, subdir), exist_ok=True)
-                ostree.extract_subpath(
-                    path, ref, f"files/share/{subdir}", os.path.join(tmpdir, subdir), True
-                )
+        metadata = repo.read_metadata(ref)
+        if not metadata:
+            return
+        if metadata.get("type", False) != "application":
+            return
 
-            self._validate(tmpdir, appid)
+        self._validate(repo.snapshot(ref), appid)
@@ -1,13 +1,13 @@
 import re
-import tempfile
 from collections import defaultdict
+from collections.abc import Mapping, Set
 
-from .. import builddir, ostree
+from .. import builddir
 from . import Check
 
 
 class FinishArgsCheck(Check):
-    def _validate(self, appid: str | None, finish_args: dict[str, set[str]]) -> None:
+    def _validate(self, appid: str | None, finish_args: Mapping[str, Set[str]]) -> None:
         if "x11" in finish_args["socket"] and "fallback-x11" in finish_args["socket"]:
             self.errors.add("finish-args-contains-both-x11-and-fallback")
 
@@ -304,6 +304,7 @@ class FinishArgsCheck(Check):
 
     def check_repo(self, path: str) -> None:
         self._populate_ref(path)
+        repo = self.context.ostree_repo(path)
         ref = self.repo_primary_ref
         if not ref:
             return
@@ -311,13 +312,15 @@ class FinishArgsCheck(Check):
 
         is_baseapp = appid.endswith(".BaseApp")
 
-        with tempfile.TemporaryDirectory() as tmpdir:
-            ostree.extract_subpath(path, ref, "/metadata", tmpdir)
-            metadata = builddir.parse_metadata(tmpdir)
-            if not metadata:
-                return
-            permissions = metadata["permissions"]
-            if not permissions and not is_baseapp:
-                self.errors.add("finish-args-not-defined")
-                return
-            self._validate(appid, permissions)
+        metadata = repo.read_metadata(ref)
+        if not metadata:
+            return
+
+        if metadata.get("type", False) != "application":
+            return
+
+        permissions = metadata["permissions"]
+        if not permissions and not is_baseapp:
+            self.errors.add("finish-args-not-defined")
+            return
+        self._validate(appid, permissions)
@@ -1,7 +1,6 @@
-import tempfile
 from typing import ClassVar
 
-from .. import builddir, ostree
+from .. import builddir
 from . import Check
 
 
@@ -70,7 +69,7 @@ class FlathubJsonCheck(Check):
 
         self._validate(appid, flathub_json, is_extra_data, is_extension)
 
-    def _check_metadata(self, metadata: dict, flathub_json: dict) -> None:
+    def _check_metadata(self, metadata: builddir.Metadata, flathub_json: dict) -> None:
         appid = metadata.get("name")
         if not appid:
             return
@@ -93,16 +92,15 @@ class FlathubJsonCheck(Check):
 
     def check_repo(self, path: str) -> None:
         self._populate_ref(path)
+        repo = self.context.ostree_repo(path)
         ref = self.repo_primary_ref
         if not ref:
             return
 
-        with tempfile.TemporaryDirectory() as tmpdir:
-            ostree.extract_subpath(path, ref, "/metadata", tmpdir)
-            metadata = builddir.parse_metadata(tmpdir)
-            if not metadata:
-                return
-            flathub_json = ostree.get_flathub_json(path, ref, tmpdir)
-            if not flathub_json:
-                return
-            self._check_metadata(metadata, flathub_json)
+        metadata = repo.read_metadata(ref)
+        if not metadata:
+            return
+        flathub_json = repo.get_flathub_json(ref)
+        if not flathub_json:
+            return
+        self._check_metadata(metadata, flathub_json)
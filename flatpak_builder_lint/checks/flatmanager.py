@@ -74,10 +74,18 @@ class FlatManagerCheck(Check):
                         self.errors.add("flat-manager-branch-repo-mismatch")
                         break
 
+                # The arch of the linted ref when there is one, so that a
+                # lint of every arch looks at the appstream of each
+                ref_parts = (self.repo_primary_ref or "").split("/")
+                if len(ref_parts) == 4 and ref_parts[2] in arches:
+                    arch = ref_parts[2]
+                else:
+                    arch = min(arches)
+
                 with tempfile.TemporaryDirectory() as tmpdir:
                     with (
                         gzip.open(
-                            f"{path}/appstream/{arches.pop()}/appstream.xml.gz", "rb"
+                            f"{path}/appstream/{arch}/appstream.xml.gz", "rb"
                         ) as appstream_gz,
                         open(f"{tmpdir}/appstream.xml", "wb") as appstream_file,
                     ):
@@ -1,26 +1,36 @@
 import importlib.resources
 import json
+from functools import cache
 
 import jsonschema
 import jsonschema.exceptions
+import jsonschema.protocols
+import jsonschema.validators
 
 from .. import staticfiles
 from . import Check
 
 
+@cache
+def _load_validator() -> jsonschema.protocols.Validator:
+    with (
+        importlib.resources.files(staticfiles).joinpath("flatpak-manifest.schema.json").open() as f
+    ):
+        schema = json.load(f)
+
+    validator_class = jsonschema.validators.validator_for(schema)
+    validator_class.check_schema(schema)
+    return validator_class(schema)
+
+
 class JSONSchemaCheck(Check):
     def check_manifest(self, manifest: dict) -> None:
-        with (
-            importlib.resources.files(staticfiles)
-            .joinpath("flatpak-manifest.schema.json")
-            .open() as f
-        ):
-            schema = json.load(f)
-
         try:
-            jsonschema.validate(manifest, schema)
+            validator = _load_validator()
         except jsonschema.exceptions.SchemaError:
             self.errors.add("jsonschema-schema-error")
-        except jsonschema.exceptions.ValidationError as exc:
+            return
+
+        if error := jsonschema.exceptions.best_match(validator.iter_errors(manifest)):
             self.errors.add("jsonschema-validation-error")
-            self.jsonschema.add(exc.message)
+            self.jsonschema.add(error.message)
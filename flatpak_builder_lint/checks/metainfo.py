@@ -1,9 +1,8 @@
 import glob
 import os
 import re
-import tempfile
 
-from .. import appstream, builddir, ostree
+from .. import appstream, builddir
 from . import Check
 
 
@@ -238,6 +237,7 @@ class MetainfoCheck(Check):
 
     def check_repo(self, path: str) -> None:
         self._populate_ref(path)
+        repo = self.context.ostree_repo(path)
         ref = self.repo_primary_ref
         if not ref:
             return
@@ -246,20 +246,10 @@ class MetainfoCheck(Check):
         if appid.endswith(".BaseApp"):
             return
 
-        with tempfile.TemporaryDirectory() as tmpdir:
-            ostree.extract_subpath(path, ref, "/metadata", tmpdir)
-            metadata = builddir.parse_metadata(tmpdir)
-            if not metadata:
-                return
-            if metadata.get("type", False) != "application":
-                return
-
-            dirs_needed = ("appdata", "metainfo", "app-info", "applications", "icons")
-
-            for subdir in dirs_needed:
-                os.makedirs(os.path.join(tmpdir, subdir), exist_ok=True)
-                ostree.extract_subpath(
-                    path, ref, f"files/share/{subdir}", os.path.join(tmpdir, subdir), True
-                )
+        metadata = repo.read_metadata(ref)
+        if not metadata:
+            return
+        if metadata.get("type", False) != "application":
+            return
 
-            self._validate(tmpdir, appid)
+        self._validate(repo.snapshot(ref), appid)
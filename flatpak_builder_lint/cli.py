@@ -1,54 +1,55 @@
 import argparse
-import importlib
-import importlib.resources
 import json
 import os
-import pkgutil
 import sys
 import textwrap
-
-import sentry_sdk
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from functools import cache
 
 from . import (
     __version__,
     appstream,
-    builddir,
     checks,
     domainutils,
-    manifest,
-    ostree,
-    staticfiles,
+    exceptions_index,
+    exceptions_matcher,
+    profiling,
+    resultcache,
 )
 
 if sentry_dsn := os.getenv("SENTRY_DSN"):
-    sentry_sdk.init(sentry_dsn)
+    import sentry_sdk
 
-for plugin_info in pkgutil.iter_modules(checks.__path__):
-    importlib.import_module(f".{plugin_info.name}", package=checks.__name__)
+    sentry_sdk.init(sentry_dsn)
 
 
-def _filter(info: set, excepts: set) -> list:
-    final = set()
-    for i in info:
-        count = False
-        for j in excepts:
-            if i is not None and i.startswith(j):
-                count = True
-                break
-        if not count:
-            final.add(i)
-    return list(final)
+# How artifacts are linted, the same for all of them in a batch, a fleet
+# or a server. Fleet workers get a pickled copy.
+@dataclass(frozen=True)
+class RunOptions:
+    enable_exceptions: bool = False
+    user_exceptions_path: str | None = None
+    jobs: int = 1
+    profile: bool = False
+    only: tuple[str, ...] = ()
+    skip: tuple[str, ...] = ()
+    fail_fast: bool = False
+    use_cache: bool = False
+    all_arches: bool = False
+    all_refs: bool = False
 
 
 def get_local_exceptions(appid: str) -> set[str]:
-    with importlib.resources.open_text(staticfiles, "exceptions.json") as f:
-        exceptions = json.load(f)
-        ret = exceptions.get(appid, [])
+    return exceptions_index.get_exceptions(appid)
 
-    if ret:
-        return set(ret)
 
-    return set()
+def reload_caches() -> None:
+    exceptions_index.clear_cache()
+    domainutils.clear_caches()
 
 
 def get_user_exceptions(file: str, appid: str) -> set[str]:
@@ -59,84 +60,222 @@ def get_user_exceptions(file: str, appid: str) -> set[str]:
     return set()
 
 
-def run_checks(
-    kind: str,
-    path: str,
-    enable_exceptions: bool = False,
-    appid: str | None = None,
-    user_exceptions_path: str | None = None,
-) -> dict[str, str | list[str | None]]:
+def _run_check_methods(
+    calls: list[tuple[checks.Check, Callable]],
+    arg: str | dict,
+    jobs: int,
+    failed: Callable[[checks.Check], bool] | None = None,
+) -> bool:
+    # Returns False if a failed check stopped the run before all checks ran
+    if jobs <= 1 or len(calls) <= 1:
+        for i, (check, method) in enumerate(calls, 1):
+            method(arg)
+            if failed is not None and failed(check):
+                return i == len(calls)
+        return True
+
+    # Most checks wait on subprocesses, OSTree or the network, so running
+    # them in threads overlaps that time
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [(check, executor.submit(method, arg)) for check, method in calls]
+        for check, future in futures:
+            future.result()
+            if failed is not None and failed(check):
+                # Checks that already started still finish
+                cancelled = [f.cancel() for _, f in futures]
+                return not any(cancelled)
+    return True
+
+
+def _loaders(
+    kind: str, context: checks.LintContext
+) -> tuple[Callable[[str], str | dict], Callable[..., str | None]]:
+    # Returns the function loading the argument of the check methods
+    # and the one inferring the app ID from that argument. Only import
+    # what the kind needs, ostree pulls in gi and OSTree.
     match kind:
         case "manifest":
-            check_method_name = "check_manifest"
-            infer_appid_func = manifest.infer_appid
-            check_method_arg: str | dict = manifest.show_manifest(path)
+            from . import manifest
+
+            return manifest.show_manifest, lambda manifest_json: manifest_json.get("id")
         case "builddir":
-            check_method_name = "check_build"
-            infer_appid_func = builddir.infer_appid
-            check_method_arg = path
+            from . import builddir
+
+            return lambda path: path, builddir.infer_appid
         case "repo":
-            check_method_name = "check_repo"
-            infer_appid_func = ostree.infer_appid
-            check_method_arg = path
+            # From the repo the checks of the run use as well
+            def infer_appid(path: str) -> str | None:
+                ref = context.ostree_repo(path).primary_ref()
+                return ref.split("/")[1] if ref else None
+
+            return lambda path: path, infer_appid
         case _:
             raise ValueError(f"Unknown kind: {kind}")
 
-    for checkclass in checks.ALL:
-        check = checkclass()
 
-        if (check_method := getattr(check, check_method_name, None)) and callable(check_method):
-            check_method(check_method_arg)
-
-    results: dict[str, str | list[str | None]] = {}
-    if errors := checks.Check.errors:
-        results["errors"] = list(errors)
-    if warnings := checks.Check.warnings:
-        results["warnings"] = list(warnings)
-    if jsonschema := checks.Check.jsonschema:
-        results["jsonschema"] = list(jsonschema)
-    if appstream := checks.Check.appstream:
-        results["appstream"] = list(appstream)
-    if desktopfile := checks.Check.desktopfile:
-        results["desktopfile"] = list(desktopfile)
-    if info := checks.Check.info:
-        results["info"] = list(info)
-
-    if enable_exceptions:
-        exceptions = None
+def _resolve_exceptions(
+    appid: str | None,
+    infer_appid: Callable[[], str | None],
+    user_exceptions_path: str | None,
+) -> set[str] | None:
+    exceptions = None
+
+    appid = appid or infer_appid()
+
+    if appid:
+        if user_exceptions_path:
+            exceptions = get_user_exceptions(user_exceptions_path, appid)
+        else:
+            exceptions = domainutils.get_remote_exceptions(appid)
 
-        appid = appid[0] if appid else infer_appid_func(path)
+        if not exceptions:
+            exceptions = get_local_exceptions(appid)
 
-        if appid:
-            if user_exceptions_path:
-                exceptions = get_user_exceptions(user_exceptions_path, appid)
-            else:
-                exceptions = domainutils.get_remote_exceptions(appid)
+    return exceptions
 
-            if not exceptions:
-                exceptions = get_local_exceptions(appid)
 
-        if exceptions:
-            if "*" in exceptions:
-                return {}
+def _reporting(
+    check: checks.Check,
+    check_method: Callable,
+    matcher: exceptions_matcher.ExceptionMatcher,
+    on_event: Callable[[dict], None],
+) -> Callable:
+    # Reports the findings of a check as soon as it is done, from the
+    # thread that ran it
+    def wrapper(arg: str | dict) -> None:
+        start = time.perf_counter()
+        check_method(arg)
+        elapsed = time.perf_counter() - start
 
-            results["errors"] = list(errors - set(exceptions))
-            if not results["errors"]:
-                results.pop("errors")
+        _report(type(check).__name__, check.results, matcher, on_event, round(elapsed, 6))
 
-            results["warnings"] = list(warnings - set(exceptions))
-            if not results["warnings"]:
-                results.pop("warnings")
+    return wrapper
+
+
+def _report(
+    name: str,
+    results: checks.LintResults,
+    matcher: exceptions_matcher.ExceptionMatcher,
+    on_event: Callable[[dict], None],
+    elapsed: float | None,
+) -> None:
+    for category, values in matcher.filter(results).items():
+        for value in values:
+            on_event({"event": "finding", "check": name, "category": category, "value": value})
+
+    if elapsed is None:
+        on_event({"event": "check", "check": name, "cached": True})
+    else:
+        on_event({"event": "check", "check": name, "time": elapsed})
 
-            if "appstream-failed-validation" in set(exceptions):
-                results.pop("appstream", None)
 
-            if "desktop-file-failed-validation" in set(exceptions):
-                results.pop("desktopfile", None)
+def _recording(check: checks.Check, check_method: Callable, ran: set[str]) -> Callable:
+    def wrapper(arg: str | dict) -> None:
+        check_method(arg)
+        ran.add(type(check).__name__)
 
-            results["info"] = _filter(set(info), set(exceptions))
-            if not results["info"]:
-                results.pop("info")
+    return wrapper
+
+
+def _ref_cache_key(context: checks.LintContext, path: str) -> str | None:
+    repo = context.ostree_repo(path)
+    ref = context.repo_primary_ref or repo.primary_ref()
+    if ref is None or (checksum := repo.resolve_rev(ref)) is None:
+        return None
+
+    return resultcache.ref_cache_key(ref, checksum, repo.list_refs())
+
+
+def _lint(
+    kind: str,
+    check_method_arg: str | dict,
+    matcher: exceptions_matcher.ExceptionMatcher,
+    options: RunOptions,
+    *,
+    repo_primary_ref: str | None = None,
+    check_profiles: dict[str, profiling.Profile] | None = None,
+    on_event: Callable[[dict], None] | None = None,
+    parent: checks.LintContext | None = None,
+    findings: dict[str, dict[str, list[str]]] | None = None,
+) -> dict[str, str | list[str] | dict | bool]:
+    check_method_name = checks.KIND_METHODS[kind]
+    context = checks.LintContext(repo_primary_ref, parent)
+
+    checkclasses = tuple(
+        checkclass
+        for checkclass in checks.load(kind, options.only, options.skip)
+        if not checks.is_excepted(checkclass, matcher)
+    )
+
+    # Repos are cached per commit of the linted ref. The entry holds the
+    # findings of each check before exceptions, so that exceptions are
+    # applied again on every lint and checks excepted earlier can still
+    # add theirs later.
+    # Only the checks selected for this lint are served from it, the
+    # others stay in the entry for later lints.
+    cache_key = None
+    stored: dict[str, dict[str, list[str]]] = {}
+    cached: dict[str, dict[str, list[str]]] = {}
+    if options.use_cache and kind == "repo" and isinstance(check_method_arg, str):
+        if (cache_key := _ref_cache_key(context, check_method_arg)) is not None:
+            stored = resultcache.get(cache_key) or {}
+        selected = {c.__name__ for c in checkclasses}
+        cached = {name: found for name, found in stored.items() if name in selected}
+        checkclasses = tuple(c for c in checkclasses if c.__name__ not in cached)
+    if options.fail_fast:
+        checkclasses = tuple(sorted(checkclasses, key=checks.cost))
+
+    check_instances = [checkclass(context) for checkclass in checkclasses]
+    check_calls = []
+    ran: set[str] = set()
+    for check in check_instances:
+        if (check_method := getattr(check, check_method_name, None)) and callable(check_method):
+            if cache_key is not None or findings is not None:
+                check_method = _recording(check, check_method, ran)
+            if check_profiles is not None:
+                check_profile = check_profiles[type(check).__name__] = profiling.Profile()
+                check_method = profiling.profiled(check_method, check_profile)
+            if on_event is not None:
+                check_method = _reporting(check, check_method, matcher, on_event)
+            check_calls.append((check, check_method))
+
+    def failed(check: checks.Check) -> bool:
+        return any(e not in matcher for e in check.errors)
+
+    try:
+        complete = _run_check_methods(
+            check_calls, check_method_arg, options.jobs, failed if options.fail_fast else None
+        )
+    finally:
+        context.close()
+
+    # Merge in a fixed order so the outcome does not depend on which
+    # check finished first
+    for check in check_instances:
+        context.results.update(check.results)
+    for name, check_results in sorted(cached.items()):
+        cached_results = checks.LintResults.from_dict(check_results)
+        context.results.update(cached_results)
+        if on_event is not None:
+            _report(name, cached_results, matcher, on_event, None)
+
+    if cache_key is not None:
+        fresh = {
+            type(check).__name__: check.results.to_dict()
+            for check in check_instances
+            if type(check).__name__ in ran and checks.is_cacheable(type(check))
+        }
+        if fresh:
+            resultcache.put(cache_key, {**stored, **fresh})
+
+    if findings is not None:
+        findings.update(
+            (type(check).__name__, matcher.filter(check.results))
+            for check in check_instances
+            if type(check).__name__ in ran
+        )
+
+    results: dict[str, str | list[str] | dict | bool] = {**matcher.filter(context.results)}
 
     help_text = (
         "Please consult the documentation at "
@@ -146,9 +285,355 @@ def run_checks(
     if any(x in results for x in ("errors", "warnings", "info")):
         results["message"] = help_text
 
+    if not complete:
+        results["partial"] = True
+
+    return results
+
+
+def _merge_results(
+    results: Iterable[dict[str, str | list[str] | dict | bool]],
+) -> dict[str, str | list[str] | dict | bool]:
+    merged: dict[str, str | list[str] | dict | bool] = {}
+    for entry in results:
+        for category in checks.LintResults.categories:
+            values = entry.get(category)
+            if isinstance(values, list):
+                known = merged.get(category)
+                merged[category] = sorted({*(known if isinstance(known, list) else ()), *values})
+        for key in ("message", "partial"):
+            if key in entry:
+                merged[key] = entry[key]
+
+    return merged
+
+
+def _lint_refs(
+    path: str,
+    refs: list[str],
+    options: RunOptions,
+    *,
+    key: str,
+    name_of: Callable[[str], str],
+    matcher_of: Callable[[str], exceptions_matcher.ExceptionMatcher],
+    check_profiles: dict[str, profiling.Profile] | None,
+    on_event: Callable[[dict], None] | None,
+    shared: checks.LintContext,
+) -> dict[str, dict[str, str | list[str] | dict | bool]]:
+    # Lints the refs at the same time, sharing the repo of the parent
+    # context. The results and events of each ref are named by name_of,
+    # events under key. Each ref gets the exceptions of its own ID.
+    matchers = {ref: matcher_of(ref) for ref in refs}
+
+    def lint_ref(ref: str) -> tuple[str, dict, dict[str, profiling.Profile] | None]:
+        name = name_of(ref)
+        ref_profiles: dict[str, profiling.Profile] | None = (
+            {} if check_profiles is not None else None
+        )
+        if matchers[ref].wildcard:
+            return name, {}, ref_profiles
+
+        results = _lint(
+            "repo",
+            path,
+            matchers[ref],
+            options,
+            repo_primary_ref=ref,
+            check_profiles=ref_profiles,
+            on_event=_tag_events(on_event, **{key: name}) if on_event else None,
+            parent=shared,
+        )
+        return name, results, ref_profiles
+
+    # Each ref runs its own checks on up to jobs threads, so the refs at
+    # the same time are bounded by the CPUs
+    from .fleet import default_workers
+
+    with ThreadPoolExecutor(max_workers=max(1, min(len(refs), default_workers()))) as executor:
+        per_ref = list(executor.map(lint_ref, refs))
+
+    if check_profiles is not None:
+        for name, _, ref_profiles in per_ref:
+            for check_name, check_profile in (ref_profiles or {}).items():
+                check_profiles[f"{name}/{check_name}"] = check_profile
+
+    return {name: results for name, results, _ in per_ref}
+
+
+def _lint_arches(
+    path: str,
+    matcher: exceptions_matcher.ExceptionMatcher,
+    options: RunOptions,
+    *,
+    repo_primary_ref: str | None,
+    check_profiles: dict[str, profiling.Profile] | None,
+    on_event: Callable[[dict], None] | None,
+    shared: checks.LintContext,
+) -> dict[str, str | list[str] | dict | bool]:
+    # Every arch of the app and branch of the primary ref
+    repo = shared.ostree_repo(path)
+    primary_ref = repo_primary_ref or repo.primary_ref()
+    if primary_ref is None or len(primary_ref.split("/")) != 4:
+        return _lint(
+            "repo",
+            path,
+            matcher,
+            options,
+            repo_primary_ref=primary_ref,
+            check_profiles=check_profiles,
+            on_event=on_event,
+            parent=shared,
+        )
+
+    kind, appid, _, branch = primary_ref.split("/")
+    refs = [
+        ref
+        for ref in sorted(repo.list_refs())
+        if (parts := ref.split("/"))[:2] == [kind, appid] and len(parts) == 4 and parts[3] == branch
+    ]
+    per_arch = _lint_refs(
+        path,
+        refs,
+        options,
+        key="arch",
+        name_of=lambda ref: ref.split("/")[2],
+        matcher_of=lambda _ref: matcher,
+        check_profiles=check_profiles,
+        on_event=on_event,
+        shared=shared,
+    )
+
+    results = _merge_results(per_arch.values())
+    results["arches"] = dict(per_arch)
+
     return results
 
 
+# Added by flatpak-builder next to every app and runtime, there is
+# nothing to lint in them on their own
+GENERATED_EXTENSION_SUFFIXES = (".Debug", ".Locale", ".Sources")
+
+
+def _lint_all_refs(
+    path: str,
+    matcher_of: Callable[[str], exceptions_matcher.ExceptionMatcher],
+    options: RunOptions,
+    *,
+    check_profiles: dict[str, profiling.Profile] | None,
+    on_event: Callable[[dict], None] | None,
+    shared: checks.LintContext,
+) -> dict[str, str | list[str] | dict | bool]:
+    # Every app, runtime and extension in the repo
+    refs = [
+        ref
+        for ref in sorted(shared.ostree_repo(path).list_refs())
+        if (parts := ref.split("/"))[0] in ("app", "runtime")
+        and len(parts) == 4
+        and not parts[1].endswith(GENERATED_EXTENSION_SUFFIXES)
+    ]
+    per_ref = _lint_refs(
+        path,
+        refs,
+        options,
+        key="ref",
+        name_of=lambda ref: ref,
+        matcher_of=matcher_of,
+        check_profiles=check_profiles,
+        on_event=on_event,
+        shared=shared,
+    )
+
+    results = _merge_results(per_ref.values())
+    results["refs"] = dict(per_ref)
+
+    return results
+
+
+def run_checks(
+    kind: str,
+    path: str,
+    options: RunOptions | None = None,
+    *,
+    appid: str | None = None,
+    repo_primary_ref: str | None = None,
+    on_event: Callable[[dict], None] | None = None,
+) -> dict[str, str | list[str] | dict | bool]:
+    options = options or RunOptions()
+    if (options.all_arches or options.all_refs) and kind != "repo":
+        raise ValueError("Only repos can be linted for all arches or refs")
+    if options.all_arches and options.all_refs:
+        raise ValueError("Lint either all arches or all refs")
+
+    start = time.perf_counter()
+    setup_profile = profiling.Profile() if options.profile else None
+    exceptions_profile = profiling.Profile() if options.profile else None
+    check_profiles: dict[str, profiling.Profile] | None = {} if options.profile else None
+
+    # Repos are opened once for the run, by whichever of the app ID
+    # inference and the checks needs them first
+    context = checks.LintContext()
+    try:
+        # The argument is only loaded once something needs it, a cache
+        # hit or a "*" exception may not
+        load, infer_appid_func = _loaders(kind, context)
+        load_arg = cache(profiling.profiled(lambda: load(path), setup_profile))
+
+        # Resolved before the checks run, so that checks whose IDs are
+        # all excepted do not run at all and fail-fast ignores excepted
+        # errors. With all refs, every ref has the exceptions of its ID.
+        resolve_exceptions = profiling.profiled(_resolve_exceptions, exceptions_profile)
+        exceptions = None
+        if options.enable_exceptions and not options.all_refs:
+            exceptions = resolve_exceptions(
+                appid, lambda: infer_appid_func(load_arg()), options.user_exceptions_path
+            )
+        matcher = exceptions_matcher.compile_exceptions(exceptions or ())
+
+        def matcher_of(ref: str) -> exceptions_matcher.ExceptionMatcher:
+            if not options.enable_exceptions:
+                return matcher
+            ref_exceptions = resolve_exceptions(
+                ref.split("/")[1], lambda: None, options.user_exceptions_path
+            )
+            return exceptions_matcher.compile_exceptions(ref_exceptions or ())
+
+        # Repos are cached per ref instead, see _lint
+        cache_key = None
+        if options.use_cache and kind != "repo" and not matcher.wildcard:
+            key_options = {
+                "exceptions": sorted(matcher.exceptions),
+                "repo_primary_ref": repo_primary_ref,
+                "only": sorted(options.only),
+                "skip": sorted(options.skip),
+                "fail_fast": options.fail_fast,
+            }
+            cache_key = profiling.profiled(resultcache.cache_key, setup_profile)(
+                kind, path, key_options
+            )
+
+        results: dict[str, str | list[str] | dict | bool]
+        if matcher.wildcard:
+            results = {}
+        elif (
+            cache_key is not None
+            and (cached := resultcache.get(cache_key)) is not None
+            and "results" in cached
+        ):
+            results = cached["results"]
+            if on_event is not None:
+                for name, check_findings in sorted(cached["checks"].items()):
+                    _report(
+                        name, checks.LintResults.from_dict(check_findings), matcher, on_event, None
+                    )
+        elif options.all_refs:
+            results = _lint_all_refs(
+                load_arg(),
+                matcher_of,
+                options,
+                check_profiles=check_profiles,
+                on_event=on_event,
+                shared=context,
+            )
+        elif options.all_arches:
+            results = _lint_arches(
+                load_arg(),
+                matcher,
+                options,
+                repo_primary_ref=repo_primary_ref,
+                check_profiles=check_profiles,
+                on_event=on_event,
+                shared=context,
+            )
+        else:
+            findings: dict[str, dict[str, list[str]]] | None = {} if cache_key is not None else None
+            results = _lint(
+                kind,
+                load_arg(),
+                matcher,
+                options,
+                repo_primary_ref=repo_primary_ref,
+                check_profiles=check_profiles,
+                on_event=on_event,
+                parent=context,
+                findings=findings,
+            )
+            if cache_key is not None:
+                # The findings of each check are kept to replay their events
+                resultcache.put(cache_key, {"results": results, "checks": findings})
+    finally:
+        context.close()
+
+    if setup_profile is not None and exceptions_profile is not None:
+        results["profile"] = {
+            "total": round(time.perf_counter() - start, 6),
+            "setup": setup_profile.to_dict(),
+            "exceptions": exceptions_profile.to_dict(),
+            "checks": {name: p.to_dict() for name, p in (check_profiles or {}).items()},
+        }
+
+    return results
+
+
+BATCH_KINDS = ("manifest", "builddir", "repo")
+
+
+def read_batch_file(file: str) -> list[tuple[str, str]]:
+    if file == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(file, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+
+    tasks = []
+    for line in map(str.strip, lines):
+        if not line or line.startswith("#"):
+            continue
+        kind, _, path = line.partition(" ")
+        tasks.append((kind, path.strip()))
+
+    return tasks
+
+
+def _tag_events(on_event: Callable[[dict], None], **tags: str) -> Callable[[dict], None]:
+    return lambda event: on_event({**tags, **event})
+
+
+def run_batch(
+    tasks: Iterable[tuple[str, str]],
+    options: RunOptions | None = None,
+    *,
+    on_event: Callable[[dict], None] | None = None,
+) -> Iterator[dict]:
+    options = options or RunOptions()
+    for kind, path in tasks:
+        entry: dict = {"kind": kind, "path": path}
+
+        if kind not in BATCH_KINDS:
+            entry["error"] = f"Unknown kind: {kind}"
+            yield entry
+            continue
+
+        task_on_event = _tag_events(on_event, kind=kind, path=path) if on_event else None
+        # Only repos have arches and refs, the other kinds of the batch
+        # are linted as usual
+        task_options = replace(
+            options,
+            all_arches=options.all_arches and kind == "repo",
+            all_refs=options.all_refs and kind == "repo",
+        )
+
+        try:
+            entry["results"] = run_checks(kind, path, task_options, on_event=task_on_event)
+        except Exception as err:
+            entry["error"] = str(err) or type(err).__name__
+
+        yield entry
+
+
+def _selectors(value: str) -> list[str]:
+    return [selector for selector in map(str.strip, value.split(",")) if selector]
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(
         description="A linter for Flatpak builds and flatpak-builder manifests",
@@ -196,6 +681,107 @@ def main() -> int:
         default=None,
     )
 
+    parser.add_argument(
+        "--format",
+        help=textwrap.dedent("""\
+        Output format. ndjson prints one line per finding and per
+        finished check as soon as they are known, followed by the
+        results"""),
+        choices=["json", "ndjson"],
+        default="json",
+    )
+    parser.add_argument(
+        "--jobs",
+        help="Number of checks to run at the same time",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--only",
+        help=textwrap.dedent("""\
+        Only run the checks with this class name or emitting IDs
+        with this prefix, comma separated or repeated"""),
+        type=_selectors,
+        action="extend",
+        default=[],
+    )
+    parser.add_argument(
+        "--skip",
+        help=textwrap.dedent("""\
+        Do not run the checks with this class name or emitting
+        IDs with this prefix, comma separated or repeated"""),
+        type=_selectors,
+        action="extend",
+        default=[],
+    )
+    parser.add_argument(
+        "--fail-fast",
+        help=textwrap.dedent("""\
+        Run the cheapest checks first and stop at the first error
+        that is not excepted. The output is marked as partial if
+        some checks did not run"""),
+        action="store_true",
+    )
+    parser.add_argument(
+        "--cache",
+        help=textwrap.dedent("""\
+        Reuse the results of an earlier lint of the same input,
+        linter version and exceptions"""),
+        action="store_true",
+    )
+    parser.add_argument(
+        "--all-arches",
+        help=textwrap.dedent("""\
+        Only with repo: lint the app on every arch in the repo at
+        the same time, the output adds the results of each arch"""),
+        action="store_true",
+    )
+    parser.add_argument(
+        "--all-refs",
+        help=textwrap.dedent("""\
+        Only with repo: lint every app, runtime and extension in the
+        repo, the output adds the results of each ref"""),
+        action="store_true",
+    )
+    parser.add_argument(
+        "--profile",
+        help=textwrap.dedent("""\
+        Add the time spent in every check, split into CPU,
+        subprocesses, network and OSTree reads, to the output"""),
+        action="store_true",
+    )
+    parser.add_argument(
+        "--workers",
+        help=textwrap.dedent("""\
+        Only with batch: lint the artifacts in this many worker
+        processes, 0 sizes the pool from the CPU and cgroup limits"""),
+        type=int,
+    )
+    parser.add_argument(
+        "--timeout",
+        help="Only with --workers: seconds after which an artifact is aborted",
+        type=float,
+    )
+    parser.add_argument(
+        "--max-tasks-per-worker",
+        help="Only with --workers: replace a worker after it linted this many artifacts",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--reload-interval",
+        help="Only with serve: seconds between reloads of exceptions and Flathub data",
+        type=float,
+    )
+    parser.add_argument(
+        "--kind",
+        help=textwrap.dedent("""\
+        Only with batch: treat the paths as artifacts of this
+        type instead of files with "type path" lines"""),
+        type=str,
+        choices=BATCH_KINDS,
+    )
+
     parser.add_argument(
         "type",
         help=textwrap.dedent("""\
@@ -204,36 +790,122 @@ def main() -> int:
         appstream expects a MetaInfo file
         manifest expects a flatpak-builder manifest
         builddir expects a flatpak-builder build directory
-        repo expects an OSTree repo exported by flatpak-builder"""),
+        repo expects an OSTree repo exported by flatpak-builder
+        batch expects files with one "type path" line per artifact
+        ("-" reads from stdin) and prints one JSON result per line
+        serve expects a UNIX socket path or HOST:PORT and answers
+        lint requests over HTTP"""),
         choices=[
             "appstream",
             "manifest",
             "builddir",
             "repo",
+            "batch",
+            "serve",
         ],
     )
     parser.add_argument(
         "path",
         help="Path to the artifact",
         type=str,
-        nargs=1,
+        nargs="+",
     )
 
     args = parser.parse_args()
     exit_code = 0
 
-    path = os.getcwd() if args.cwd else args.path[0]
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
 
-    if args.ref:
-        checks.Check.repo_primary_ref = args.ref[0]
+    if args.all_arches and args.all_refs:
+        parser.error("--all-arches and --all-refs cannot be used together")
 
-    if args.type != "appstream":
-        if results := run_checks(
-            args.type, path, args.exceptions, args.appid, args.user_exceptions
-        ):
-            if "errors" in results:
+    # Checks running on the thread pool report from their own threads
+    print_lock = threading.Lock()
+
+    def print_event(event: dict) -> None:
+        with print_lock:
+            print(json.dumps(event), flush=True)  # noqa: T201
+
+    on_event = print_event if args.format == "ndjson" else None
+
+    options = RunOptions(
+        enable_exceptions=args.exceptions,
+        user_exceptions_path=args.user_exceptions,
+        jobs=args.jobs,
+        profile=args.profile,
+        only=tuple(args.only),
+        skip=tuple(args.skip),
+        fail_fast=args.fail_fast,
+        use_cache=args.cache,
+        all_arches=args.all_arches,
+        all_refs=args.all_refs,
+    )
+
+    if args.type == "batch":
+        if args.kind:
+            tasks = [(args.kind, p) for p in args.path]
+        else:
+            tasks = [task for file in args.path for task in read_batch_file(file)]
+
+        if args.workers is not None:
+            from . import fleet
+
+            if on_event is not None:
+                parser.error("--format ndjson is not supported with --workers")
+
+            entries = fleet.run_fleet(
+                tasks,
+                options,
+                workers=args.workers,
+                timeout=args.timeout,
+                max_tasks_per_worker=args.max_tasks_per_worker,
+            )
+        else:
+            entries = run_batch(tasks, options, on_event=on_event)
+
+        for entry in entries:
+            if "error" in entry or "errors" in entry.get("results", {}):
                 exit_code = 1
+            print_event(entry)
 
+        sys.exit(exit_code)
+
+    if len(args.path) > 1:
+        parser.error(f"{args.type} expects a single path")
+
+    if args.type == "serve":
+        from . import server
+
+        if args.reload_interval is None:
+            args.reload_interval = server.DEFAULT_RELOAD_INTERVAL
+
+        server.serve(args.path[0], args.reload_interval, args.jobs)
+        sys.exit(0)
+
+    if args.all_arches and args.type != "repo":
+        parser.error("--all-arches is only supported with repo and batch")
+    if args.all_refs and args.type != "repo":
+        parser.error("--all-refs is only supported with repo and batch")
+
+    path = os.getcwd() if args.cwd else args.path[0]
+
+    if args.type != "appstream":
+        results = run_checks(
+            args.type,
+            path,
+            options,
+            appid=args.appid[0] if args.appid else None,
+            repo_primary_ref=args.ref[0] if args.ref else None,
+            on_event=on_event,
+        )
+        if "errors" in results:
+            exit_code = 1
+
+        if on_event is not None:
+            # Always end the stream, even without findings
+            on_event(results)
+        elif results:
             output = json.dumps(results, indent=4)
             print(output)  # noqa: T201
     else:
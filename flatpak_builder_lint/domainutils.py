@@ -1,12 +1,13 @@
 import os
 from functools import cache
+from typing import TYPE_CHECKING
 
-import gi
-import requests
-from requests_cache import CachedSession
+from . import profiling
 
-gi.require_version("OSTree", "1.0")
-from gi.repository import GLib, OSTree  # noqa: E402
+# requests, requests_cache and gi are imported where they are used, they
+# are slow to import and many lints never reach the network
+if TYPE_CHECKING:
+    from requests_cache import CachedSession
 
 CODE_HOSTS = (
     "io.github.",
@@ -30,9 +31,13 @@ XDG_CACHE_HOME = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")
 CACHEDIR = os.path.join(XDG_CACHE_HOME, "flatpak-builder-lint")
 CACHEFILE = os.path.join(CACHEDIR, "requests_cache")
 
-os.makedirs(CACHEDIR, exist_ok=True)
 
-session = CachedSession(CACHEFILE, backend="sqlite", expire_after=3600)
+@cache
+def get_session() -> "CachedSession":
+    from requests_cache import CachedSession
+
+    os.makedirs(CACHEDIR, exist_ok=True)
+    return CachedSession(CACHEFILE, backend="sqlite", expire_after=3600)
 
 
 def ignore_ref(ref: str) -> bool:
@@ -47,8 +52,12 @@ def ignore_ref(ref: str) -> bool:
 
 @cache
 def fetch_summary_bytes(url: str) -> bytes:
+    import requests
+
     try:
-        r = session.get(url, allow_redirects=False, timeout=REQUEST_TIMEOUT)
+        with profiling.http_call() as call:
+            r = get_session().get(url, allow_redirects=False, timeout=REQUEST_TIMEOUT)
+            call.from_cache = getattr(r, "from_cache", False)
         if r.status_code == 200 and r.headers.get("Content-Type") == "application/octet-stream":
             return r.content
     except requests.exceptions.RequestException:
@@ -59,6 +68,11 @@ def fetch_summary_bytes(url: str) -> bytes:
 
 @cache
 def get_appids_from_summary(url: str) -> set[str]:
+    import gi
+
+    gi.require_version("OSTree", "1.0")
+    from gi.repository import GLib, OSTree
+
     summary = GLib.Bytes.new(fetch_summary_bytes(url))
     refs, _ = GLib.Variant.new_from_bytes(
         GLib.VariantType.new(OSTree.SUMMARY_GVARIANT_STRING), summary, True
@@ -79,8 +93,11 @@ def check_url(url: str, strict: bool = False) -> bool:
     if not url.startswith(("https://", "http://")):
         raise Exception("Invalid input")
 
+    import requests
+
     try:
-        r = requests.get(url, allow_redirects=False, timeout=REQUEST_TIMEOUT)
+        with profiling.http_call():
+            r = requests.get(url, allow_redirects=False, timeout=REQUEST_TIMEOUT)
         return r.ok and not strict or strict and r.status_code == 200
     except requests.exceptions.RequestException:
         return False
@@ -88,13 +105,16 @@ def check_url(url: str, strict: bool = False) -> bool:
 
 @cache
 def get_remote_exceptions(appid: str) -> set[str]:
+    import requests
+
     try:
         # exception updates should be reflected immediately
-        r = requests.get(
-            f"{FLATHUB_API_URL}/exceptions/{appid}",
-            allow_redirects=False,
-            timeout=REQUEST_TIMEOUT,
-        )
+        with profiling.http_call():
+            r = requests.get(
+                f"{FLATHUB_API_URL}/exceptions/{appid}",
+                allow_redirects=False,
+                timeout=REQUEST_TIMEOUT,
+            )
         if r.status_code == 200 and r.headers.get("Content-Type") == "application/json":
             return set(r.json())
     except requests.exceptions.RequestException:
@@ -226,3 +246,16 @@ def is_app_on_flathub_api(appid: str) -> bool:
 @cache
 def is_app_on_flathub_summary(appid: str) -> bool:
     return bool(appid in get_all_apps_on_flathub())
+
+
+def clear_caches() -> None:
+    for func in (
+        fetch_summary_bytes,
+        get_appids_from_summary,
+        get_all_apps_on_flathub,
+        check_url,
+        get_remote_exceptions,
+        is_app_on_flathub_api,
+        is_app_on_flathub_summary,
+    ):
+        func.cache_clear()
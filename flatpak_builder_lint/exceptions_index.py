@@ -0,0 +1,207 @@
+import contextlib
+import glob
+import hashlib
+import importlib.resources
+import json
+import mmap
+import os
+import pathlib
+import struct
+import tempfile
+import time
+import zlib
+from functools import cache
+
+from . import domainutils, staticfiles
+
+# On disk hash table of the bundled exceptions.json, so that a lookup
+# only reads the entry of one app ID instead of parsing the whole file.
+# It is generated into staticfiles by utils/exceptions_index.py and only
+# built in the cache directory when that one is missing or out of date.
+#
+# header: magic, SHA-256 of exceptions.json, number of slots
+# slots:  offset of the entry, 0 for an empty slot (linear probing)
+# entry:  app ID length, app ID, IDs length, newline separated IDs
+MAGIC = b"FBLEXC02"
+HEADER = struct.Struct("<8s32sI")
+SLOT = struct.Struct("<I")
+KEY_LENGTH = struct.Struct("<H")
+VALUE_LENGTH = struct.Struct("<I")
+
+STALE_INDEX_AGE = 30 * 24 * 3600
+
+
+def _hash(key: bytes) -> int:
+    # Stable across processes, unlike hash()
+    return zlib.crc32(key)
+
+
+def build(exceptions: dict[str, dict[str, str]], digest: bytes = bytes(32)) -> bytes:
+    slots = max(1, 2 * len(exceptions))
+    table = [0] * slots
+    entries = bytearray()
+    entries_start = HEADER.size + slots * SLOT.size
+
+    for appid, excepts in exceptions.items():
+        key = appid.encode("utf-8")
+        value = "\n".join(excepts).encode("utf-8")
+
+        slot = _hash(key) % slots
+        while table[slot]:
+            slot = (slot + 1) % slots
+        table[slot] = entries_start + len(entries)
+
+        entries += KEY_LENGTH.pack(len(key)) + key + VALUE_LENGTH.pack(len(value)) + value
+
+    return (
+        HEADER.pack(MAGIC, digest, slots) + b"".join(SLOT.pack(o) for o in table) + bytes(entries)
+    )
+
+
+def lookup(index: bytes | mmap.mmap, appid: str) -> set[str]:
+    magic, _, slots = HEADER.unpack_from(index, 0)
+    if magic != MAGIC:
+        raise ValueError("Not an exceptions index")
+
+    key = appid.encode("utf-8")
+    slot = _hash(key) % slots
+
+    for _ in range(slots):
+        (offset,) = SLOT.unpack_from(index, HEADER.size + slot * SLOT.size)
+        if not offset:
+            break
+
+        (key_length,) = KEY_LENGTH.unpack_from(index, offset)
+        offset += KEY_LENGTH.size
+        if index[offset : offset + key_length] == key:
+            offset += key_length
+            (value_length,) = VALUE_LENGTH.unpack_from(index, offset)
+            offset += VALUE_LENGTH.size
+            value = index[offset : offset + value_length].decode("utf-8")
+            return set(value.split("\n")) if value else set()
+
+        slot = (slot + 1) % slots
+
+    return set()
+
+
+def build_from_json(data: bytes) -> bytes:
+    return build(json.loads(data), hashlib.sha256(data).digest())
+
+
+def _source() -> pathlib.Path | None:
+    source = importlib.resources.files(staticfiles) / "exceptions.json"
+    return source if isinstance(source, pathlib.Path) else None
+
+
+def _packaged_index_path() -> pathlib.Path | None:
+    index = importlib.resources.files(staticfiles) / "exceptions.idx"
+    return index if isinstance(index, pathlib.Path) else None
+
+
+def _mmap(path: str | pathlib.Path) -> mmap.mmap:
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _open_packaged_index(source: pathlib.Path) -> mmap.mmap | None:
+    # Only used while it was generated from this exceptions.json
+    if (index_path := _packaged_index_path()) is None:
+        return None
+
+    try:
+        index = _mmap(index_path)
+    except (OSError, ValueError):
+        return None
+
+    if len(index) < HEADER.size:
+        index.close()
+        return None
+
+    magic, digest, _ = HEADER.unpack_from(index, 0)
+    if magic != MAGIC or digest != hashlib.sha256(source.read_bytes()).digest():
+        index.close()
+        return None
+
+    return index
+
+
+def _index_path(source: pathlib.Path) -> str:
+    st = source.stat()
+    key = f"{source.resolve()}:{st.st_size}:{st.st_mtime_ns}:{MAGIC.decode()}"
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(domainutils.CACHEDIR, f"exceptions-{digest}.idx")
+
+
+def _write_index(source: pathlib.Path, index_path: str) -> None:
+    data = build_from_json(source.read_bytes())
+
+    os.makedirs(domainutils.CACHEDIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=domainutils.CACHEDIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        # Concurrent builders write the same content, the last one wins
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp_path)
+        raise
+
+    # Other installed versions of the linter may share the cache
+    # directory, only remove the indexes nobody opened for a while
+    now = time.time()
+    for stale in glob.glob(os.path.join(domainutils.CACHEDIR, "exceptions-*.idx")):
+        with contextlib.suppress(FileNotFoundError):
+            if stale != index_path and now - os.path.getmtime(stale) > STALE_INDEX_AGE:
+                os.unlink(stale)
+
+
+@cache
+def open_index() -> mmap.mmap | None:
+    if (source := _source()) is None:
+        return None
+
+    if (index := _open_packaged_index(source)) is not None:
+        return index
+
+    try:
+        index_path = _index_path(source)
+        if not os.path.exists(index_path):
+            _write_index(source, index_path)
+        else:
+            # Marks the index as in use for the cleanup above
+            with contextlib.suppress(OSError):
+                os.utime(index_path)
+
+        index = _mmap(index_path)
+    except (OSError, ValueError):
+        return None
+
+    if index[: len(MAGIC)] != MAGIC:
+        index.close()
+        return None
+
+    return index
+
+
+@cache
+def _load_exceptions() -> dict:
+    source = importlib.resources.files(staticfiles) / "exceptions.json"
+    with source.open(encoding="utf-8") as f:
+        exceptions: dict = json.load(f)
+    return exceptions
+
+
+def get_exceptions(appid: str) -> set[str]:
+    if (index := open_index()) is not None:
+        return lookup(index, appid)
+
+    # The index could not be written, e.g. on a read only cache
+    # directory or when the package is imported from a zip file
+    return set(_load_exceptions().get(appid, []))
+
+
+def clear_cache() -> None:
+    open_index.cache_clear()
+    _load_exceptions.cache_clear()
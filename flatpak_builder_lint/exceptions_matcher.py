@@ -0,0 +1,72 @@
+from collections.abc import Iterable
+from functools import lru_cache
+
+from .checks import LintResults
+
+# Marks the end of an exception in the trie, never a single character
+_END = ""
+
+# Validator output is not prefixed with an ID, it is dropped as a whole
+# when the ID of the failed validation is excepted
+VALIDATION_IDS = {
+    "jsonschema": "jsonschema-validation-error",
+    "appstream": "appstream-failed-validation",
+    "desktopfile": "desktop-file-failed-validation",
+}
+
+
+class ExceptionMatcher:
+    def __init__(self, exceptions: Iterable[str]) -> None:
+        self.exceptions = frozenset(exceptions)
+        self.wildcard = "*" in self.exceptions
+
+        self._trie: dict = {}
+        for exception in self.exceptions:
+            node = self._trie
+            for char in exception:
+                node = node.setdefault(char, {})
+            node[_END] = True
+
+    def __contains__(self, exception: object) -> bool:
+        return exception in self.exceptions
+
+    def matches_prefix(self, line: str) -> bool:
+        # True if an exception is a prefix of the line, in a single walk
+        # over the line whatever the number of exceptions
+        node = self._trie
+        if _END in node:
+            return True
+
+        for char in line:
+            child = node.get(char)
+            if child is None:
+                return False
+            if _END in child:
+                return True
+            node = child
+
+        return False
+
+    def filter(self, results: LintResults) -> dict[str, list[str]]:
+        # Errors and warnings are IDs and must be excepted exactly, info
+        # lines start with the ID followed by a message
+        filtered = LintResults()
+        filtered.errors = {e for e in results.errors if e not in self.exceptions}
+        filtered.warnings = {w for w in results.warnings if w not in self.exceptions}
+        filtered.info = {i for i in results.info if not self.matches_prefix(i)}
+
+        for category, validation_id in VALIDATION_IDS.items():
+            if validation_id not in self.exceptions:
+                setattr(filtered, category, getattr(results, category))
+
+        return filtered.to_dict()
+
+
+@lru_cache(maxsize=256)
+def _compile(exceptions: frozenset[str]) -> ExceptionMatcher:
+    return ExceptionMatcher(exceptions)
+
+
+def compile_exceptions(exceptions: Iterable[str]) -> ExceptionMatcher:
+    # Batch and serve runs lint the same apps repeatedly
+    return _compile(frozenset(exceptions))
@@ -0,0 +1,181 @@
+import contextlib
+import math
+import multiprocessing
+import os
+import signal
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from multiprocessing.connection import Connection, wait
+from multiprocessing.context import SpawnProcess
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .cli import RunOptions
+
+# gi and GLib do not survive fork() well, so workers are always spawned
+MP_CONTEXT = multiprocessing.get_context("spawn")
+
+
+def _read_first_line(path: str) -> str | None:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.readline().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_limit() -> float | None:
+    if cpu_max := _read_first_line("/sys/fs/cgroup/cpu.max"):
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+
+    quota_us = _read_first_line("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+    period_us = _read_first_line("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+    if quota_us and period_us and int(quota_us) > 0:
+        return int(quota_us) / int(period_us)
+
+    return None
+
+
+def default_workers() -> int:
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+    if (limit := cgroup_cpu_limit()) is not None:
+        cpus = min(cpus, math.ceil(limit))
+
+    return max(1, cpus)
+
+
+def _worker_main(conn: Connection, max_tasks: int, options: "RunOptions") -> None:
+    # Own process group, so that a timeout also kills the subprocesses
+    # started by the checks
+    os.setsid()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    from . import cli
+
+    done = 0
+    while not max_tasks or done < max_tasks:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+
+        entries = cli.run_batch([task], options)
+        conn.send(next(entries))
+        done += 1
+
+
+class _Worker:
+    def __init__(self, max_tasks: int, options: "RunOptions") -> None:
+        self.conn, child_conn = MP_CONTEXT.Pipe()
+        self.process: SpawnProcess = MP_CONTEXT.Process(
+            target=_worker_main, args=(child_conn, max_tasks, options), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+        self.max_tasks = max_tasks
+        self.done = 0
+        self.task: tuple[str, str] | None = None
+        self.deadline: float | None = None
+
+    def submit(self, task: tuple[str, str], timeout: float | None) -> None:
+        self.task = task
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.conn.send(task)
+
+    @property
+    def exhausted(self) -> bool:
+        return bool(self.max_tasks) and self.done >= self.max_tasks
+
+    def stop(self) -> None:
+        # The worker may already have exited after its last task
+        with contextlib.suppress(OSError):
+            self.conn.send(None)
+        self.conn.close()
+        self.process.join()
+
+    def kill(self) -> None:
+        if self.process.pid is not None:
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                self.process.kill()
+        self.conn.close()
+        self.process.join()
+
+
+def _failed(task: tuple[str, str], error: str) -> dict:
+    kind, path = task
+    return {"kind": kind, "path": path, "error": error}
+
+
+def run_fleet(
+    tasks: Iterable[tuple[str, str]],
+    options: "RunOptions | None" = None,
+    *,
+    workers: int = 0,
+    timeout: float | None = None,
+    max_tasks_per_worker: int = 0,
+) -> Iterator[dict]:
+    if options is None:
+        from .cli import RunOptions
+
+        options = RunOptions()
+
+    pending = deque(tasks)
+    size = workers or default_workers()
+    pool: list[_Worker] = []
+
+    try:
+        while pending or any(w.task for w in pool):
+            while pending and len(pool) < size:
+                pool.append(_Worker(max_tasks_per_worker, options))
+
+            for worker in pool:
+                if worker.task is None and pending:
+                    worker.submit(pending.popleft(), timeout)
+
+            busy = [w for w in pool if w.task is not None]
+            deadlines = [w.deadline for w in busy if w.deadline is not None]
+            wait_timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+
+            ready = wait([w.conn for w in busy], wait_timeout)
+
+            for worker in busy:
+                if (task := worker.task) is None:
+                    continue
+
+                if worker.conn in ready:
+                    try:
+                        entry = worker.conn.recv()
+                    except EOFError:
+                        entry = _failed(task, "Worker exited unexpectedly")
+                        worker.kill()
+                        pool.remove(worker)
+                        yield entry
+                        continue
+
+                    worker.task = None
+                    worker.done += 1
+                    if worker.exhausted:
+                        worker.stop()
+                        pool.remove(worker)
+                    yield entry
+                elif worker.deadline is not None and time.monotonic() >= worker.deadline:
+                    entry = _failed(task, f"Timed out after {timeout} seconds")
+                    worker.kill()
+                    pool.remove(worker)
+                    yield entry
+    finally:
+        for worker in pool:
+            if worker.task is None:
+                worker.stop()
+            else:
+                worker.kill()
@@ -3,15 +3,18 @@ import json
 import os
 import subprocess
 
+from . import profiling
+
 
 def is_git_directory(path: str) -> bool:
-    res = subprocess.run(
-        ["git", "rev-parse"],
-        cwd=path,
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL,
-        check=False,
-    )
+    with profiling.subprocess_call():
+        res = subprocess.run(
+            ["git", "rev-parse"],
+            cwd=path,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=False,
+        )
     return res.returncode == os.EX_OK
 
 
@@ -22,11 +25,12 @@ def show_manifest(filename: str) -> dict:
     if not os.path.exists(filename):
         raise OSError(errno.ENOENT, f"No such manifest file: {filename}")
 
-    ret = subprocess.run(
-        ["flatpak-builder", "--show-manifest", filename],
-        capture_output=True,
-        check=False,
-    )
+    with profiling.subprocess_call():
+        ret = subprocess.run(
+            ["flatpak-builder", "--show-manifest", filename],
+            capture_output=True,
+            check=False,
+        )
 
     if ret.returncode != 0:
         raise Exception(ret.stderr.decode("utf-8"))
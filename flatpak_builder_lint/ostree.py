@@ -1,11 +1,19 @@
+import errno
 import json
 import os
+import tempfile
+import threading
+from collections.abc import Callable, Hashable, Iterator
+from contextlib import contextmanager
+from typing import NamedTuple, TypeVar
 
 import gi
 
 gi.require_version("OSTree", "1.0")
 from gi.repository import Gio, GLib, OSTree  # noqa: E402
 
+from . import builddir, profiling  # noqa: E402
+
 
 def open_ostree_repo(repo_path: str) -> OSTree.Repo:
     if not os.path.exists(repo_path):
@@ -21,23 +29,8 @@ def open_ostree_repo(repo_path: str) -> OSTree.Repo:
     return repo
 
 
-def get_refs(repo_path: str, ref_prefix: str | None) -> set[str]:
-    repo = open_ostree_repo(repo_path)
-    _, refs = repo.list_refs(ref_prefix, None)
-
-    return set(refs.keys())
-
-
 def get_primary_ref(repo_path: str) -> str | None:
-    refs = get_refs(repo_path, None)
-
-    ref: str
-
-    for ref in refs:
-        if ref.startswith("app/"):
-            return ref
-
-    return None
+    return LintRepo(repo_path).primary_ref()
 
 
 def infer_appid(path: str) -> str | None:
@@ -48,45 +41,253 @@ def infer_appid(path: str) -> str | None:
     return None
 
 
-def extract_subpath(
-    repo_path: str,
-    ref: str,
-    subpath: str,
-    dest: str,
-    should_pass: bool = False,
-) -> None:
-    repo = open_ostree_repo(repo_path)
-    opts = OSTree.RepoCheckoutAtOptions()
-    # https://gitlab.gnome.org/GNOME/pygobject/-/issues/639
-    opts.mode = int(OSTree.RepoCheckoutMode.USER)  # type: ignore
-    opts.overwrite_mode = int(OSTree.RepoCheckoutOverwriteMode.ADD_FILES)  # type: ignore
-    opts.subpath = subpath
-
-    _, rev = repo.resolve_rev(ref, True)
-
-    # https://sourceware.org/git/?p=glibc.git;a=blob;f=io/fcntl.h;h=f157991782681caabe9bd7edb46ec205731965af;hb=HEAD#l149
-    AT_FDCWD = -100
-    if rev:
-        if should_pass:
-            try:
+def _tree_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+
+    size = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            file_path = os.path.join(root, file)
+            if not os.path.islink(file_path):
+                size += os.path.getsize(file_path)
+    return size
+
+
+# Directories under files/share the checks read from disk. They are
+# checked out together, once per lint run, see LintRepo.snapshot
+SNAPSHOT_SUBDIRS = ("appdata", "metainfo", "app-info", "applications", "icons")
+
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class RepoStat(NamedTuple):
+    mode: int
+    size: int
+
+
+@contextmanager
+def _not_found_as_oserror(ref: str, path: str) -> Iterator[None]:
+    try:
+        yield
+    except GLib.Error as err:
+        if err.matches(Gio.io_error_quark(), Gio.IOErrorEnum.NOT_FOUND):
+            raise FileNotFoundError(errno.ENOENT, f"No such file in {ref}: {path}") from err
+        raise
+
+
+# The repo of a single lint run. It is opened once and the refs and
+# revisions are resolved once, however many checks ask for them. The
+# checks of a run share it from several threads. The lock only guards
+# the memo dicts, the repo itself is read without it.
+class LintRepo:
+    def __init__(self, repo_path: str) -> None:
+        self.path = repo_path
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._snapshot_locks: dict[str, threading.Lock] = {}
+        self._repo: OSTree.Repo | None = None
+        self._refs: dict[str | None, dict[str, str]] = {}
+        self._revs: dict[str, str | None] = {}
+        self._roots: dict[str, Gio.File] = {}
+        self._commits: dict[str, GLib.Variant] = {}
+        self._trees: dict[str, dict[str, str]] = {}
+        self._snapshots: dict[str, tempfile.TemporaryDirectory[str]] = {}
+
+    @property
+    def repo(self) -> OSTree.Repo:
+        with self._open_lock:
+            if self._repo is None:
+                self._repo = open_ostree_repo(self.path)
+            return self._repo
+
+    def _memo(self, memo: dict[K, V], key: K, compute: Callable[[], V]) -> V:
+        with self._lock:
+            if key in memo:
+                return memo[key]
+
+        # Two threads may both compute a missing value, the first one
+        # stored wins
+        value = compute()
+        with self._lock:
+            return memo.setdefault(key, value)
+
+    def list_refs(self, ref_prefix: str | None = None) -> dict[str, str]:
+        return self._memo(
+            self._refs, ref_prefix, lambda: dict(self.repo.list_refs(ref_prefix, None)[1])
+        )
+
+    def resolve_rev(self, ref: str) -> str | None:
+        return self._memo(self._revs, ref, lambda: self.repo.resolve_rev(ref, True)[1])
+
+    def primary_ref(self) -> str | None:
+        # Sorted so that a repo with several app refs, e.g. one per arch,
+        # always gives the same answer
+        return next((ref for ref in sorted(self.list_refs()) if ref.startswith("app/")), None)
+
+    def extract_subpath(
+        self,
+        ref: str,
+        subpath: str,
+        dest: str,
+        should_pass: bool = False,
+    ) -> None:
+        repo = self.repo
+        opts = OSTree.RepoCheckoutAtOptions()
+        # https://gitlab.gnome.org/GNOME/pygobject/-/issues/639
+        opts.mode = int(OSTree.RepoCheckoutMode.USER)  # type: ignore
+        opts.overwrite_mode = int(OSTree.RepoCheckoutOverwriteMode.ADD_FILES)  # type: ignore
+        opts.subpath = subpath
+        # Scratch checkouts are thrown away, they need not survive a crash
+        opts.enable_fsync = False
+
+        rev = self.resolve_rev(ref)
+
+        # https://sourceware.org/git/?p=glibc.git;a=blob;f=io/fcntl.h;h=f157991782681caabe9bd7edb46ec205731965af;hb=HEAD#l149
+        AT_FDCWD = -100
+        if rev:
+            # Only walk the destination when somebody looks at the numbers
+            size_before = _tree_size(dest) if profiling.is_active() else 0
+
+            if should_pass:
+                try:
+                    repo.checkout_at(opts, AT_FDCWD, dest, rev, None)
+                except GLib.Error as err:
+                    if err.matches(Gio.io_error_quark(), Gio.IOErrorEnum.NOT_FOUND):
+                        pass
+                    else:
+                        raise
+            else:
                 repo.checkout_at(opts, AT_FDCWD, dest, rev, None)
-            except GLib.Error as err:
-                if err.matches(Gio.io_error_quark(), Gio.IOErrorEnum.NOT_FOUND):
-                    pass
-                else:
-                    raise
+
+            if profiling.is_active():
+                profiling.add_ostree_bytes(_tree_size(dest) - size_before)
+
+    def load_commit(self, ref: str) -> GLib.Variant:
+        rev = self.resolve_rev(ref)
+        if not rev:
+            raise FileNotFoundError(errno.ENOENT, f"No such ref: {ref}")
+
+        return self._memo(
+            self._commits, rev, lambda: self.repo.load_variant(OSTree.ObjectType.COMMIT, rev)[1]
+        )
+
+    def tree_checksum(self, ref: str) -> str:
+        return str(OSTree.checksum_from_bytes_v(self.load_commit(ref).get_child_value(6)))
+
+    def read_metadata(self, ref: str) -> builddir.Metadata:
+        # flatpak build-export stores the metadata file in the commit
+        # metadata, fall back to the file for commits made otherwise
+        commit_metadata = self.load_commit(ref).get_child_value(0)
+        value = commit_metadata.lookup_value("xa.metadata", GLib.VariantType.new("s"))
+        if value is not None:
+            data = value.get_string().encode("utf-8")
         else:
-            repo.checkout_at(opts, AT_FDCWD, dest, rev, None)
+            data = self.read_file(ref, "metadata")
+
+        return builddir.parse_metadata_bytes(data)
+
+    def list_tree(self, ref: str) -> dict[str, str]:
+        # Paths of all the files of a commit and their checksums, read
+        # from the dirtree objects without touching the file contents
+        tree = self.tree_checksum(ref)
+        return self._memo(self._trees, tree, lambda: dict(self._walk_dirtree(tree, "")))
+
+    def _walk_dirtree(self, checksum: str, prefix: str) -> Iterator[tuple[str, str]]:
+        # (a(say)a(sayay)): files and their checksums, then directories
+        # and the checksums of their dirtree and dirmeta
+        _, dirtree = self.repo.load_variant(OSTree.ObjectType.DIR_TREE, checksum)
+
+        files = dirtree.get_child_value(0)
+        for i in range(files.n_children()):
+            entry = files.get_child_value(i)
+            name = entry.get_child_value(0).get_string()
+            yield prefix + name, OSTree.checksum_from_bytes_v(entry.get_child_value(1))
+
+        dirs = dirtree.get_child_value(1)
+        for i in range(dirs.n_children()):
+            entry = dirs.get_child_value(i)
+            name = entry.get_child_value(0).get_string()
+            subtree = OSTree.checksum_from_bytes_v(entry.get_child_value(1))
+            yield from self._walk_dirtree(subtree, f"{prefix}{name}/")
+
+    def snapshot(self, ref: str) -> str:
+        # A checkout of SNAPSHOT_SUBDIRS shared by all the checks of the
+        # run, laid out like files/share. It must be treated as read only.
+        # Checks waiting for the snapshot of one ref do not hold up the
+        # others.
+        with self._lock:
+            ref_lock = self._snapshot_locks.setdefault(ref, threading.Lock())
+
+        with ref_lock:
+            with self._lock:
+                if ref in self._snapshots:
+                    return self._snapshots[ref].name
+
+            snapshot = tempfile.TemporaryDirectory(prefix="flatpak-builder-lint-")
+            try:
+                for subdir in SNAPSHOT_SUBDIRS:
+                    dest = os.path.join(snapshot.name, subdir)
+                    os.makedirs(dest)
+                    self.extract_subpath(ref, f"files/share/{subdir}", dest, True)
+            except BaseException:
+                snapshot.cleanup()
+                raise
+
+            with self._lock:
+                self._snapshots[ref] = snapshot
+            return snapshot.name
+
+    def close(self) -> None:
+        with self._lock:
+            for snapshot in self._snapshots.values():
+                snapshot.cleanup()
+            self._snapshots.clear()
+
+    # Read only access to the files of a commit, without checking them
+    # out. Paths are relative to the root of the commit.
+
+    def _resolve_path(self, ref: str, path: str) -> Gio.File:
+        rev = self.resolve_rev(ref)
+        if not rev:
+            raise FileNotFoundError(errno.ENOENT, f"No such ref: {ref}")
+        root = self._memo(self._roots, rev, lambda: self.repo.read_commit(rev, None)[1])
+
+        path = path.strip("/")
+        return root.resolve_relative_path(path) if path else root
+
+    def read_file(self, ref: str, path: str) -> bytes:
+        with _not_found_as_oserror(ref, path):
+            _, contents, _ = self._resolve_path(ref, path).load_contents(None)
+
+        profiling.add_ostree_bytes(len(contents))
+        return bytes(contents)
+
+    def list_dir(self, ref: str, path: str) -> list[str]:
+        with _not_found_as_oserror(ref, path):
+            enumerator = self._resolve_path(ref, path).enumerate_children(
+                "standard::name", Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS, None
+            )
+            names = []
+            while (info := enumerator.next_file(None)) is not None:
+                names.append(info.get_name())
 
+        return sorted(names)
 
-def get_flathub_json(repo_path: str, ref: str, dest: str) -> dict[str, str | bool | list[str]]:
-    extract_subpath(repo_path, ref, "/files/flathub.json", dest, True)
+    def stat(self, ref: str, path: str) -> RepoStat:
+        with _not_found_as_oserror(ref, path):
+            info = self._resolve_path(ref, path).query_info(
+                "standard::size,unix::mode", Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS, None
+            )
 
-    flathub_json_path = os.path.join(dest, "flathub.json")
-    flathub_json: dict = {}
+        return RepoStat(info.get_attribute_uint32("unix::mode"), info.get_size())
 
-    if os.path.exists(flathub_json_path):
-        with open(flathub_json_path) as fp:
-            flathub_json = json.load(fp)
+    def get_flathub_json(self, ref: str) -> dict[str, str | bool | list[str]]:
+        try:
+            flathub_json: dict = json.loads(self.read_file(ref, "files/flathub.json"))
+        except FileNotFoundError:
+            return {}
 
-    return flathub_json
+        return flathub_json
@@ -0,0 +1,107 @@
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+
+class Profile:
+    def __init__(self) -> None:
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.subprocess = 0.0
+        self.subprocess_calls = 0
+        self.http_hit = 0.0
+        self.http_hit_calls = 0
+        self.http_miss = 0.0
+        self.http_miss_calls = 0
+        self.ostree_bytes = 0
+
+    def to_dict(self) -> dict[str, float | int]:
+        return {
+            "wall": round(self.wall, 6),
+            "cpu": round(self.cpu, 6),
+            "subprocess": round(self.subprocess, 6),
+            "subprocess_calls": self.subprocess_calls,
+            "http_hit": round(self.http_hit, 6),
+            "http_hit_calls": self.http_hit_calls,
+            "http_miss": round(self.http_miss, 6),
+            "http_miss_calls": self.http_miss_calls,
+            "ostree_bytes": self.ostree_bytes,
+        }
+
+
+# The profile of the code running in the current thread, None unless
+# --profile was passed. Helpers below do nothing without one.
+_current: ContextVar[Profile | None] = ContextVar("profile", default=None)
+
+
+def is_active() -> bool:
+    return _current.get() is not None
+
+
+@contextmanager
+def record(profile: Profile) -> Iterator[Profile]:
+    token = _current.set(profile)
+    wall = time.perf_counter()
+    cpu = time.thread_time()
+    try:
+        yield profile
+    finally:
+        profile.wall += time.perf_counter() - wall
+        profile.cpu += time.thread_time() - cpu
+        _current.reset(token)
+
+
+def profiled(func: Callable[..., Any], profile: Profile | None) -> Callable[..., Any]:
+    if profile is None:
+        return func
+
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with record(profile):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def subprocess_call() -> Iterator[None]:
+    if (profile := _current.get()) is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.subprocess += time.perf_counter() - start
+        profile.subprocess_calls += 1
+
+
+class HTTPCall:
+    from_cache = False
+
+
+@contextmanager
+def http_call() -> Iterator[HTTPCall]:
+    call = HTTPCall()
+    if (profile := _current.get()) is None:
+        yield call
+        return
+
+    start = time.perf_counter()
+    try:
+        yield call
+    finally:
+        elapsed = time.perf_counter() - start
+        if call.from_cache:
+            profile.http_hit += elapsed
+            profile.http_hit_calls += 1
+        else:
+            profile.http_miss += elapsed
+            profile.http_miss_calls += 1
+
+
+def add_ostree_bytes(size: int) -> None:
+    if (profile := _current.get()) is not None:
+        profile.ostree_bytes += size
@@ -0,0 +1,183 @@
+import contextlib
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections.abc import Callable, Iterator, Mapping
+
+from . import __version__, domainutils
+
+MAX_AGE = 24 * 3600
+MAX_SIZE = 256 * 1024 * 1024
+EVICT_INTERVAL = 60
+
+# Strings in a manifest that may name another manifest file, e.g. an
+# entry of "modules" or "include"
+INCLUDED_FILE_RE = re.compile(r"""["']?([^"'\s:,\[\]]+\.(?:json|ya?ml))["']?""")
+
+_evict_state = {"last": 0.0}
+_evict_lock = threading.Lock()
+
+
+def _read_file(path: str) -> bytes:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return b"\0missing"
+
+
+def _manifest_files(path: str) -> list[str]:
+    # flatpak-builder resolves module files relative to the file naming
+    # them, follow those references without parsing the manifests
+    files: list[str] = []
+    pending = [os.path.realpath(path)]
+    while pending:
+        current = pending.pop()
+        if current in files:
+            continue
+        files.append(current)
+
+        try:
+            with open(current, encoding="utf-8") as f:
+                content = f.read()
+        except (OSError, UnicodeDecodeError):
+            continue
+
+        basedir = os.path.dirname(current)
+        for match in INCLUDED_FILE_RE.finditer(content):
+            included = os.path.realpath(os.path.join(basedir, match.group(1)))
+            if os.path.isfile(included):
+                pending.append(included)
+
+    return files
+
+
+def _fingerprint_manifest(path: str) -> Iterator[bytes]:
+    files = _manifest_files(path)
+    basedir = os.path.dirname(files[0])
+    files.extend(os.path.join(basedir, name) for name in ("flathub.json", ".gitmodules"))
+
+    for file in files:
+        yield file.encode("utf-8", "surrogateescape")
+        yield _read_file(file)
+
+
+def _fingerprint_builddir(path: str) -> Iterator[bytes]:
+    yield _read_file(os.path.join(path, "metadata"))
+    yield _read_file(os.path.join(path, "files", "flathub.json"))
+
+    # The share tree can be large, stat it instead of reading it
+    share = os.path.join(path, "files", "share")
+    for root, dirs, files in os.walk(share):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            st = os.lstat(file_path)
+            entry = f"{os.path.relpath(file_path, share)}:{st.st_mode}:{st.st_size}"
+            entry += f":{st.st_mtime_ns}"
+            if os.path.islink(file_path):
+                entry += f":{os.readlink(file_path)}"
+            yield entry.encode("utf-8", "surrogateescape")
+
+
+FINGERPRINTS: dict[str, Callable[[str], Iterator[bytes]]] = {
+    "manifest": _fingerprint_manifest,
+    "builddir": _fingerprint_builddir,
+}
+
+
+def cache_key(kind: str, path: str, options: dict) -> str | None:
+    # The flat-manager check looks at the state of a remote build
+    if kind not in FINGERPRINTS or os.getenv("FLAT_MANAGER_BUILD_ID"):
+        return None
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps([__version__, kind, options], sort_keys=True).encode())
+    for part in FINGERPRINTS[kind](path):
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+
+    return digest.hexdigest()
+
+
+def ref_cache_key(ref: str, checksum: str, repo_refs: Mapping[str, str]) -> str:
+    # The commit of the ref, plus the arches in the repo and the commits
+    # of their screenshots refs that ScreenshotsCheck looks at. Findings
+    # that depend on anything else are not cached, see
+    # checks.VOLATILE_CHECKS
+    arches = sorted({r.split("/")[2] for r in repo_refs if len(r.split("/")) == 4})
+    screenshots = sorted(
+        (r, commit) for r, commit in repo_refs.items() if r.startswith("screenshots/")
+    )
+    key = json.dumps([__version__, "repo", ref, checksum, arches, screenshots])
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _results_dir() -> str:
+    return os.path.join(domainutils.CACHEDIR, "results")
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(_results_dir(), key[:2], f"{key}.json")
+
+
+def get(key: str) -> dict | None:
+    entry_path = _entry_path(key)
+    try:
+        if time.time() - os.path.getmtime(entry_path) > MAX_AGE:
+            return None
+        with open(entry_path, encoding="utf-8") as f:
+            results: dict = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    return results
+
+
+def put(key: str, results: dict) -> None:
+    entry_path = _entry_path(key)
+    try:
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(entry_path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(results, f)
+            os.replace(tmp_path, entry_path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(tmp_path)
+            raise
+    except OSError:
+        # The cache is an optimisation, a lint must not fail because of it
+        return
+
+    evict()
+
+
+def evict(force: bool = False) -> None:
+    # Scanning the cache on every write would make batch runs quadratic
+    with _evict_lock:
+        now = time.time()
+        if not force and now - _evict_state["last"] < EVICT_INTERVAL:
+            return
+        _evict_state["last"] = now
+
+    entries = []
+    for root, _, files in os.walk(_results_dir()):
+        for name in files:
+            entry_path = os.path.join(root, name)
+            with contextlib.suppress(FileNotFoundError):
+                st = os.stat(entry_path)
+                entries.append((st.st_mtime, st.st_size, entry_path))
+
+    entries.sort(reverse=True)
+    total = 0
+    for mtime, size, entry_path in entries:
+        total += size
+        if now - mtime > MAX_AGE or total > MAX_SIZE:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(entry_path)
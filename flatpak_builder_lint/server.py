@@ -0,0 +1,136 @@
+import contextlib
+import json
+import os
+import re
+import socketserver
+import stat
+import sys
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import __version__, cli
+
+DEFAULT_RELOAD_INTERVAL = 3600
+
+
+class LintRequestHandler(BaseHTTPRequestHandler):
+    server_version = f"flatpak-builder-lint/{__version__}"
+    jobs = 1
+
+    def address_string(self) -> str:
+        if isinstance(self.client_address, tuple):
+            return str(self.client_address[0])
+        return "unix"
+
+    def _send_json(self, status: HTTPStatus, body: object) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") != "/health":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+            return
+        self._send_json(HTTPStatus.OK, {"version": __version__})
+
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") != "/lint":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))
+            kind = request["kind"]
+            path = request["path"]
+            only = request.get("only", [])
+            skip = request.get("skip", [])
+            if not all(isinstance(s, list) for s in (only, skip)):
+                raise TypeError
+        except (ValueError, KeyError, TypeError):
+            self._send_json(
+                HTTPStatus.BAD_REQUEST, {"error": "Expected a JSON object with kind and path"}
+            )
+            return
+
+        if kind not in cli.BATCH_KINDS:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": f"Unknown kind: {kind}"})
+            return
+
+        try:
+            options = cli.RunOptions(
+                enable_exceptions=bool(request.get("exceptions", False)),
+                user_exceptions_path=request.get("user_exceptions"),
+                jobs=self.jobs,
+                profile=bool(request.get("profile", False)),
+                only=tuple(only),
+                skip=tuple(skip),
+                fail_fast=bool(request.get("fail_fast", False)),
+                use_cache=bool(request.get("cache", False)),
+                all_arches=kind == "repo" and bool(request.get("all_arches", False)),
+                all_refs=kind == "repo" and bool(request.get("all_refs", False)),
+            )
+            results = cli.run_checks(
+                kind,
+                path,
+                options,
+                appid=request.get("appid"),
+                repo_primary_ref=request.get("ref"),
+            )
+        except Exception as err:
+            self._send_json(
+                HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(err) or type(err).__name__}
+            )
+            return
+
+        self._send_json(HTTPStatus.OK, results)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def parse_address(address: str) -> str | tuple[str, int]:
+    if "/" not in address and (match := re.fullmatch(r"(.*):(\d+)", address)):
+        return (match.group(1) or "127.0.0.1", int(match.group(2)))
+    return address
+
+
+def _reload_periodically(interval: float, stop: threading.Event) -> None:
+    while not stop.wait(interval):
+        cli.reload_caches()
+
+
+def serve(address: str, reload_interval: float = DEFAULT_RELOAD_INTERVAL, jobs: int = 1) -> None:
+    handler = type("Handler", (LintRequestHandler,), {"jobs": jobs})
+    server: socketserver.BaseServer
+
+    bind_address = parse_address(address)
+    if isinstance(bind_address, tuple):
+        server = ThreadingHTTPServer(bind_address, handler)
+    else:
+        if os.path.exists(bind_address) and stat.S_ISSOCK(os.stat(bind_address).st_mode):
+            os.unlink(bind_address)
+        server = UnixHTTPServer(bind_address, handler)
+
+    stop = threading.Event()
+    if reload_interval > 0:
+        threading.Thread(
+            target=_reload_periodically, args=(reload_interval, stop), daemon=True
+        ).start()
+
+    print(f"Listening on {address}", file=sys.stderr, flush=True)  # noqa: T201
+
+    try:
+        with contextlib.suppress(KeyboardInterrupt):
+            server.serve_forever()
+    finally:
+        stop.set()
+        server.server_close()
+        if isinstance(bind_address, str):
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(bind_address)
@@ -0,0 +1,222 @@
+import gzip
+import importlib.util
+import json
+import os
+import pathlib
+import shutil
+import threading
+import urllib.parse
+from collections.abc import Callable, Generator
+from functools import cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import cast
+
+import pytest
+
+from flatpak_builder_lint import domainutils
+
+# The benchmarks need pytest-benchmark and the libraries of the checks
+if not all(importlib.util.find_spec(module) for module in ("pytest_benchmark", "gi")):
+    collect_ignore_glob = ["test_*.py"]
+
+APPID = "org.flathub.gui"
+TEMPLATE_DIR = os.path.join(
+    os.path.dirname(__file__), "..", "builddir", "min_success_metadata", APPID
+)
+
+
+def empty_summary() -> bytes:
+    import gi
+
+    gi.require_version("OSTree", "1.0")
+    from gi.repository import GLib, OSTree
+
+    summary = GLib.Variant(OSTree.SUMMARY_GVARIANT_STRING, ([], {}))
+    data: bytes = summary.get_data_as_bytes().get_data()
+    return data
+
+
+# Answers everything the checks ask Flathub and app websites, so the
+# benchmarks run offline and do not measure the internet
+class FlathubStandInHandler(BaseHTTPRequestHandler):
+    summary = b""
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        pass
+
+    def _send(self, content_type: str, body: bytes) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if self.path.endswith("/summary"):
+            self._send("application/octet-stream", self.summary)
+        elif self.path.startswith("/api/v2/exceptions/"):
+            self._send("application/json", b"[]")
+        elif self.path.startswith("/api/v2/"):
+            self._send("application/json", b"{}")
+        else:
+            self._send("text/html", b"<html></html>")
+
+
+@pytest.fixture(scope="session")
+def flathub_standin() -> Generator[str, None, None]:
+    handler = type("Handler", (FlathubStandInHandler,), {"summary": empty_summary()})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def offline(
+    flathub_standin: str, tmp_path_factory: pytest.TempPathFactory, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cachedir = str(tmp_path_factory.mktemp("cache"))
+    monkeypatch.setattr(domainutils, "CACHEDIR", cachedir)
+    monkeypatch.setattr(domainutils, "CACHEFILE", os.path.join(cachedir, "requests_cache"))
+    monkeypatch.setattr(domainutils, "FLATHUB_API_URL", f"{flathub_standin}/api/v2")
+    monkeypatch.setattr(domainutils, "FLATHUB_STABLE_REPO_URL", f"{flathub_standin}/repo")
+    monkeypatch.setattr(domainutils, "FLATHUB_BETA_REPO_URL", f"{flathub_standin}/beta-repo")
+    monkeypatch.delenv("FLAT_MANAGER_BUILD_ID", raising=False)
+
+    check_url = domainutils.check_url.__wrapped__
+
+    @cache
+    def check_url_offline(url: str, strict: bool = False) -> bool:
+        result: bool = check_url(f"{flathub_standin}/{urllib.parse.quote(url, safe='')}", strict)
+        return result
+
+    monkeypatch.setattr(domainutils, "check_url", check_url_offline)
+    domainutils.get_session.cache_clear()
+    domainutils.clear_caches()
+
+
+def _write_manifest(directory: str, modules: int) -> str:
+    # Chains of nested modules, five deep
+    def module(index: int, depth: int) -> dict:
+        entry: dict = {
+            "name": f"module-{index}-{depth}",
+            "buildsystem": "meson",
+            "sources": [
+                {
+                    "type": "archive",
+                    "url": f"https://example.org/module-{index}-{depth}.tar.xz",
+                    "sha256": "0" * 64,
+                }
+            ],
+        }
+        if depth < 4:
+            entry["modules"] = [module(index, depth + 1)]
+        return entry
+
+    manifest = {
+        "id": APPID,
+        "runtime": "org.gnome.Platform",
+        "runtime-version": "47",
+        "sdk": "org.gnome.Sdk",
+        "command": "foo",
+        "finish-args": ["--share=ipc", "--socket=wayland", "--socket=fallback-x11"],
+        "modules": [module(i, 0) for i in range(max(1, modules // 5))],
+    }
+
+    path = os.path.join(directory, f"{APPID}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    return path
+
+
+def _write_builddir(directory: str, files: int) -> str:
+    share = os.path.join(directory, "files", "share")
+    applications = os.path.join(share, "applications")
+    metainfo = os.path.join(share, "metainfo")
+    catalogue = os.path.join(share, "app-info", "xmls")
+    catalogue_icons = os.path.join(share, "app-info", "icons", "flatpak", "128x128")
+    for path in (applications, metainfo, catalogue, catalogue_icons):
+        os.makedirs(path, exist_ok=True)
+
+    shutil.copy(os.path.join(TEMPLATE_DIR, "metadata"), directory)
+    shutil.copy(os.path.join(TEMPLATE_DIR, f"{APPID}.appdata.xml"), metainfo)
+    with (
+        open(os.path.join(TEMPLATE_DIR, f"{APPID}.xml"), "rb") as src,
+        gzip.open(os.path.join(catalogue, f"{APPID}.xml.gz"), "wb") as dst,
+    ):
+        dst.write(src.read())
+    open(os.path.join(catalogue_icons, f"{APPID}.png"), "wb").close()
+
+    desktop_file = os.path.join(TEMPLATE_DIR, f"{APPID}.desktop")
+    shutil.copy(desktop_file, applications)
+
+    # Half of the files are extra desktop files, the other half icons
+    # spread over the usual hicolor sizes
+    sizes = ("16x16", "32x32", "48x48", "64x64", "128x128", "256x256", "512x512")
+    for i in range(files // 2):
+        shutil.copy(desktop_file, os.path.join(applications, f"{APPID}.extra{i}.desktop"))
+
+        icons = os.path.join(share, "icons", "hicolor", sizes[i % len(sizes)], "apps")
+        os.makedirs(icons, exist_ok=True)
+        open(os.path.join(icons, f"{APPID}.extra{i}.png"), "wb").close()
+
+    icons = os.path.join(share, "icons", "hicolor", "128x128", "apps")
+    os.makedirs(icons, exist_ok=True)
+    open(os.path.join(icons, f"{APPID}.png"), "wb").close()
+
+    return directory
+
+
+def _write_repo(directory: str, builddir: str, arches: list[str], screenshots: int) -> str:
+    import gi
+
+    gi.require_version("OSTree", "1.0")
+    from gi.repository import Gio, OSTree
+
+    repo_path = os.path.join(directory, "repo")
+    repo = OSTree.Repo.new(Gio.File.new_for_path(repo_path))
+    repo.create(OSTree.RepoMode.ARCHIVE_Z2, None)
+
+    screenshots_dir = os.path.join(directory, "screenshots")
+    os.makedirs(screenshots_dir)
+    for i in range(screenshots):
+        with open(os.path.join(screenshots_dir, f"{APPID}-{i}.png"), "wb") as f:
+            f.write(os.urandom(4096))
+
+    def commit(ref: str, tree: str) -> None:
+        repo.prepare_transaction(None)
+        mtree = OSTree.MutableTree.new()
+        repo.write_directory_to_mtree(Gio.File.new_for_path(tree), mtree, None, None)
+        _, root = repo.write_mtree(mtree, None)
+        _, checksum = repo.write_commit(
+            None, "Benchmark", None, None, cast(OSTree.RepoFile, root), None
+        )
+        repo.transaction_set_ref(None, ref, checksum)
+        repo.commit_transaction(None)
+
+    for arch in arches:
+        commit(f"app/{APPID}/{arch}/stable", builddir)
+        commit(f"screenshots/{arch}", screenshots_dir)
+
+    return repo_path
+
+
+@pytest.fixture
+def make_manifest(tmp_path: pathlib.Path) -> Callable[[int], str]:
+    return lambda modules: _write_manifest(str(tmp_path), modules)
+
+
+@pytest.fixture
+def make_builddir(tmp_path: pathlib.Path) -> Callable[[int], str]:
+    return lambda files: _write_builddir(str(tmp_path / "builddir"), files)
+
+
+@pytest.fixture
+def make_repo(tmp_path: pathlib.Path) -> Callable[[list[str], int], str]:
+    def make(arches: list[str], screenshots: int) -> str:
+        builddir = _write_builddir(str(tmp_path / "builddir"), 20)
+        return _write_repo(str(tmp_path), builddir, arches, screenshots)
+
+    return make
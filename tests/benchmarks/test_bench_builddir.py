@@ -0,0 +1,27 @@
+from collections.abc import Callable
+from typing import Any
+
+import pytest
+
+from flatpak_builder_lint import cli, domainutils
+
+
+@pytest.mark.parametrize("files", [10, 100, 1000])
+def test_bench_builddir(benchmark: Any, make_builddir: Callable[[int], str], files: int) -> None:
+    path = make_builddir(files)
+    benchmark.pedantic(
+        cli.run_checks, args=("builddir", path), setup=domainutils.clear_caches, rounds=5
+    )
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_bench_builddir_jobs(
+    benchmark: Any, make_builddir: Callable[[int], str], jobs: int
+) -> None:
+    path = make_builddir(100)
+    benchmark.pedantic(
+        cli.run_checks,
+        args=("builddir", path, cli.RunOptions(jobs=jobs)),
+        setup=domainutils.clear_caches,
+        rounds=5,
+    )
@@ -0,0 +1,19 @@
+import shutil
+from collections.abc import Callable
+from typing import Any
+
+import pytest
+
+from flatpak_builder_lint import cli, domainutils
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("flatpak-builder") is None, reason="flatpak-builder is needed to parse manifests"
+)
+
+
+@pytest.mark.parametrize("modules", [10, 100, 500])
+def test_bench_manifest(benchmark: Any, make_manifest: Callable[[int], str], modules: int) -> None:
+    path = make_manifest(modules)
+    benchmark.pedantic(
+        cli.run_checks, args=("manifest", path), setup=domainutils.clear_caches, rounds=5
+    )
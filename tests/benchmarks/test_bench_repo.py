@@ -0,0 +1,26 @@
+from collections.abc import Callable
+from typing import Any
+
+import pytest
+
+from flatpak_builder_lint import cli, domainutils
+
+
+@pytest.mark.parametrize(
+    ("arches", "screenshots"),
+    [
+        (["x86_64"], 10),
+        (["x86_64", "aarch64"], 100),
+        (["x86_64", "aarch64", "i386", "arm"], 500),
+    ],
+)
+def test_bench_repo(
+    benchmark: Any,
+    make_repo: Callable[[list[str], int], str],
+    arches: list[str],
+    screenshots: int,
+) -> None:
+    path = make_repo(arches, screenshots)
+    benchmark.pedantic(
+        cli.run_checks, args=("repo", path), setup=domainutils.clear_caches, rounds=5
+    )
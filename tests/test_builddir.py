@@ -1,13 +1,16 @@
 import glob
 import gzip
 import os
+import pathlib
 import shutil
 import tempfile
 from collections.abc import Generator
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 
-from flatpak_builder_lint import checks, cli
+from flatpak_builder_lint import checks, cli, domainutils
+from flatpak_builder_lint.builddir import parse_metadata, parse_metadata_bytes
 
 
 def create_catalogue(test_dir: str, xml_fname: str) -> None:
@@ -106,8 +109,6 @@ def change_to_tmpdir(tmp_testdir: str) -> Generator[None, None, None]:
 
 
 def run_checks(filename: str) -> dict:
-    checks.Check.errors = set()
-    checks.Check.warnings = set()
     return cli.run_checks("builddir", filename)
 
 
@@ -442,3 +443,101 @@ def test_builddir_appstream_missing_timestamp() -> None:
     ret = run_checks(testdir)
     found_errors = set(ret["errors"])
     assert "appstream-release-tag-missing-timestamp" in found_errors
+
+
+def test_builddir_reentrant_runs() -> None:
+    testdirs = ["tests/builddir/dconf-access", "tests/builddir/finish_args_xdg_dirs"]
+    sequential = [set(run_checks(testdir)["errors"]) for testdir in testdirs]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        concurrent = [set(ret["errors"]) for ret in executor.map(run_checks, testdirs)]
+
+    assert concurrent == sequential
+    assert "finish-args-dconf-talk-name" not in sequential[1]
+
+
+def test_builddir_jobs() -> None:
+    testdir = "tests/builddir/desktop-file"
+    assert cli.run_checks("builddir", testdir, cli.RunOptions(jobs=4)) == cli.run_checks(
+        "builddir", testdir
+    )
+
+
+def test_builddir_profile() -> None:
+    testdir = "tests/builddir/desktop-file"
+    ret = cli.run_checks("builddir", testdir, cli.RunOptions(profile=True))
+    profile = ret.pop("profile")
+    assert ret == cli.run_checks("builddir", testdir)
+
+    assert isinstance(profile, dict)
+    assert "DesktopfileCheck" in profile["checks"]
+    assert profile["checks"]["DesktopfileCheck"]["subprocess_calls"] >= 1
+    assert profile["total"] >= profile["checks"]["DesktopfileCheck"]["wall"]
+
+
+def test_builddir_fail_fast() -> None:
+    testdir = "tests/builddir/finish_args_xdg_dirs"
+    ret = cli.run_checks("builddir", testdir, cli.RunOptions(fail_fast=True))
+    full = cli.run_checks("builddir", testdir)
+
+    assert ret["partial"] is True
+    assert "partial" not in full
+
+    errors, full_errors = ret["errors"], full["errors"]
+    assert isinstance(errors, list)
+    assert isinstance(full_errors, list)
+    assert "finish-args-arbitrary-xdg-data-rw-access" in errors
+    assert set(errors) <= set(full_errors)
+
+
+def test_builddir_events() -> None:
+    testdir = "tests/builddir/finish_args_xdg_dirs"
+    events: list[dict] = []
+    ret = cli.run_checks("builddir", testdir, cli.RunOptions(jobs=4), on_event=events.append)
+
+    errors = {e["value"] for e in events if e["event"] == "finding" and e["category"] == "errors"}
+    assert isinstance(ret["errors"], list)
+    assert errors == set(ret["errors"])
+
+    finished = [e["check"] for e in events if e["event"] == "check"]
+    assert sorted(finished) == sorted(c.__name__ for c in checks.load("builddir"))
+
+
+def test_parse_metadata_bytes() -> None:
+    testdir = "tests/builddir/finish_args"
+    with open(os.path.join(testdir, "metadata"), "rb") as f:
+        data = f.read()
+
+    assert parse_metadata_bytes(data) == parse_metadata(testdir)
+
+
+def test_parse_metadata_cached(tmp_path: pathlib.Path) -> None:
+    shutil.copy("tests/builddir/finish_args/metadata", tmp_path)
+    metadata = parse_metadata(str(tmp_path))
+
+    assert parse_metadata(str(tmp_path)) is metadata
+    assert metadata["permissions"]["not-a-permission"] == frozenset()
+    with pytest.raises(TypeError):
+        metadata["name"] = "org.example.Changed"  # type: ignore[index]
+
+    with open(tmp_path / "metadata", "a", encoding="utf-8") as f:
+        f.write("\n[Extra Data]\nname=data\n")
+    assert parse_metadata(str(tmp_path))["extra-data"] == "yes"
+
+
+def test_builddir_cached_events(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(domainutils, "CACHEDIR", str(tmp_path))
+    monkeypatch.delenv("FLAT_MANAGER_BUILD_ID", raising=False)
+    testdir = "tests/builddir/finish_args_xdg_dirs"
+
+    def findings(events: list[dict]) -> set[tuple[str, str, str]]:
+        return {(e["check"], e["category"], e["value"]) for e in events if e["event"] == "finding"}
+
+    options = cli.RunOptions(use_cache=True)
+    fresh: list[dict] = []
+    ret = cli.run_checks("builddir", testdir, options, on_event=fresh.append)
+    cached: list[dict] = []
+    assert cli.run_checks("builddir", testdir, options, on_event=cached.append) == ret
+
+    assert findings(cached) == findings(fresh)
+    assert all(e.get("cached") for e in cached if e["event"] == "check")
@@ -0,0 +1,96 @@
+import importlib
+import pathlib
+import pkgutil
+import re
+import subprocess
+import sys
+
+from flatpak_builder_lint import checks
+
+
+def test_index_matches_check_modules() -> None:
+    modules = {info.name for info in pkgutil.iter_modules(checks.__path__)}
+    assert modules == {info.module for info in checks.INDEX}
+
+    for info in checks.INDEX:
+        module = importlib.import_module(f"flatpak_builder_lint.checks.{info.module}")
+        checkclass = getattr(module, info.name)
+        methods = tuple(
+            method
+            for method in checks.KIND_METHODS.values()
+            if callable(getattr(checkclass, method, None))
+        )
+        assert methods == info.methods
+
+
+def test_load_imports_only_needed_modules() -> None:
+    code = (
+        "import sys\n"
+        "from flatpak_builder_lint import checks\n"
+        "checks.load('manifest')\n"
+        "print(' '.join(m for m in sys.modules if m.startswith('flatpak_builder_lint.checks.')))"
+    )
+    ret = subprocess.run([sys.executable, "-c", code], capture_output=True, check=True, text=True)
+    loaded = {m.rsplit(".", 1)[1] for m in ret.stdout.split()}
+
+    assert {"appid", "jsonschema", "modules", "toplevel"} <= loaded
+    assert not {"desktop", "flatmanager", "metainfo", "screenshots"} & loaded
+
+
+def test_load_classes_implement_kind() -> None:
+    for kind, method in checks.KIND_METHODS.items():
+        for checkclass in checks.load(kind):
+            assert callable(getattr(checkclass, method, None))
+
+
+def test_index_lists_emitted_ids() -> None:
+    for info in checks.INDEX:
+        source = (pathlib.Path(checks.__path__[0]) / f"{info.module}.py").read_text()
+        for match in re.finditer(r'(?:errors|warnings)\.add\(\s*f?"([^":{]*)(\{)?', source):
+            emitted, formatted = match.groups()
+            if formatted:
+                assert any(i.endswith("*") and emitted.startswith(i[:-1]) for i in info.ids)
+            else:
+                assert checks.is_selected(info.name, info.ids, only=(emitted,)), emitted
+
+
+def test_load_selection() -> None:
+    names = {c.__name__ for c in checks.load("repo", only=("appstream-",))}
+    assert names == {"FlatManagerCheck", "MetainfoCheck", "ScreenshotsCheck"}
+
+    names = {c.__name__ for c in checks.load("manifest", only=("finish-args-has-nosocket",))}
+    assert names == {"FinishArgsCheck"}
+
+    names = {c.__name__ for c in checks.load("manifest", skip=("JSONSchemaCheck", "module-"))}
+    assert names == {"AppIDCheck", "FinishArgsCheck", "FlathubJsonCheck", "TopLevelCheck"}
+
+
+def test_load_skips_unselected_modules() -> None:
+    code = (
+        "import sys\n"
+        "from flatpak_builder_lint import checks\n"
+        "checks.load('manifest', only=('appid-',))\n"
+        "print(' '.join(m for m in sys.modules if m.startswith('flatpak_builder_lint.checks.')))"
+    )
+    ret = subprocess.run([sys.executable, "-c", code], capture_output=True, check=True, text=True)
+    loaded = {m.rsplit(".", 1)[1] for m in ret.stdout.split()}
+
+    assert loaded == {"appid"}
+
+
+def test_is_excepted() -> None:
+    info = next(info for info in checks.INDEX if info.name == "FlathubJsonCheck")
+    checkclass = type(info.name, (), {})
+
+    assert checks.is_excepted(checkclass, set(info.ids))
+    assert not checks.is_excepted(checkclass, set(info.ids[1:]))
+
+    finish_args = type("FinishArgsCheck", (), {})
+    assert not checks.is_excepted(finish_args, {"finish-args-*"})
+
+
+def test_is_cacheable() -> None:
+    assert checks.is_cacheable(type("MetainfoCheck", (), {}))
+    assert not checks.is_cacheable(type("FlatManagerCheck", (), {}))
+    assert checks.is_cacheable(type("ScreenshotsCheck", (), {}))
+    assert not checks.is_cacheable(type("ThirdPartyCheck", (), {}))
@@ -0,0 +1,80 @@
+import importlib.resources
+import json
+import os
+import pathlib
+import time
+
+import pytest
+
+from flatpak_builder_lint import domainutils, exceptions_index, staticfiles
+
+
+@pytest.fixture(autouse=True)
+def cachedir(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(domainutils, "CACHEDIR", str(tmp_path))
+    exceptions_index.clear_cache()
+
+
+def test_index_matches_exceptions_json() -> None:
+    source = importlib.resources.files(staticfiles) / "exceptions.json"
+    with source.open(encoding="utf-8") as f:
+        exceptions = json.load(f)
+
+    index = exceptions_index.open_index()
+    assert index is not None
+
+    for appid, excepts in exceptions.items():
+        assert exceptions_index.lookup(index, appid) == set(excepts)
+    assert exceptions_index.lookup(index, "org.example.NotExcepted") == set()
+
+
+def test_packaged_index_is_current(tmp_path: pathlib.Path) -> None:
+    source = importlib.resources.files(staticfiles) / "exceptions.json"
+    packaged = importlib.resources.files(staticfiles) / "exceptions.idx"
+    assert packaged.read_bytes() == exceptions_index.build_from_json(source.read_bytes())
+
+    assert exceptions_index.open_index() is not None
+    assert not list(tmp_path.glob("exceptions-*.idx"))
+
+
+def test_stale_packaged_index(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    stale = tmp_path / "exceptions.idx"
+    stale.write_bytes(exceptions_index.build_from_json(b'{"org.example.App": {"*": ""}}'))
+    monkeypatch.setattr(exceptions_index, "_packaged_index_path", lambda: stale)
+
+    assert exceptions_index.get_exceptions("org.example.App") == set()
+    assert exceptions_index.get_exceptions("org.flathub.exceptions_wildcard") == {"*"}
+    assert list(tmp_path.glob("exceptions-*.idx"))
+
+
+def test_index_lookup() -> None:
+    index = exceptions_index.build({"a": {"x": "", "y": ""}, "b": {}, "c": {"*": ""}})
+
+    assert exceptions_index.lookup(index, "a") == {"x", "y"}
+    assert exceptions_index.lookup(index, "b") == set()
+    assert exceptions_index.lookup(index, "c") == {"*"}
+    assert exceptions_index.lookup(index, "d") == set()
+
+
+def test_index_fallback(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(exceptions_index, "_packaged_index_path", lambda: None)
+    monkeypatch.setattr(domainutils, "CACHEDIR", "/proc/flatpak-builder-lint")
+
+    assert exceptions_index.open_index() is None
+    assert exceptions_index.get_exceptions("org.flathub.exceptions_wildcard") == {"*"}
+
+
+def test_index_keeps_recent_indexes(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(exceptions_index, "_packaged_index_path", lambda: None)
+    other_version = tmp_path / "exceptions-0000000000000000.idx"
+    other_version.write_bytes(b"")
+    abandoned = tmp_path / "exceptions-1111111111111111.idx"
+    abandoned.write_bytes(b"")
+    old = time.time() - exceptions_index.STALE_INDEX_AGE - 1
+    os.utime(abandoned, (old, old))
+
+    assert exceptions_index.open_index() is not None
+    assert other_version.exists()
+    assert not abandoned.exists()
@@ -0,0 +1,40 @@
+from flatpak_builder_lint.checks import LintResults
+from flatpak_builder_lint.exceptions_matcher import ExceptionMatcher, compile_exceptions
+
+
+def test_matcher_prefix() -> None:
+    matcher = ExceptionMatcher({"finish-args-arbitrary", "appid-url-not-reachable"})
+
+    assert matcher.matches_prefix("finish-args-arbitrary-xdg-data-rw-access: message")
+    assert matcher.matches_prefix("appid-url-not-reachable: Tried https://example.org")
+    assert not matcher.matches_prefix("finish-args-arb")
+    assert not matcher.matches_prefix("appid-filename-mismatch: message")
+    assert "appid-url-not-reachable" in matcher
+    assert "finish-args-arbitrary-xdg-data-rw-access" not in matcher
+
+
+def test_matcher_filter() -> None:
+    results = LintResults()
+    results.errors = {"appid-filename-mismatch", "finish-args-arbitrary-dbus-access"}
+    results.warnings = {"finish-args-has-nodevice-all"}
+    results.appstream = {"E: org.example.App:7: cid-has-number-prefix"}
+    results.desktopfile = {"error: key Exec is missing"}
+    results.info = {
+        "appid-filename-mismatch: Manifest filename does not match app-id",
+        "finish-args-arbitrary-dbus-access: message",
+    }
+
+    matcher = ExceptionMatcher({"appid-filename-mismatch", "appstream-failed-validation"})
+    assert matcher.filter(results) == {
+        "errors": ["finish-args-arbitrary-dbus-access"],
+        "warnings": ["finish-args-has-nodevice-all"],
+        "desktopfile": ["error: key Exec is missing"],
+        "info": ["finish-args-arbitrary-dbus-access: message"],
+    }
+    assert ExceptionMatcher(()).filter(results) == results.to_dict()
+
+
+def test_matcher_wildcard() -> None:
+    assert compile_exceptions(["*"]).wildcard
+    assert compile_exceptions(["*"]) is compile_exceptions({"*"})
+    assert not compile_exceptions(["appid-filename-mismatch"]).wildcard
@@ -1,11 +1,16 @@
+import http.client
+import json
 import os
 import shutil
+import socket
 import tempfile
+import threading
+import time
 from collections.abc import Generator
 
 import pytest
 
-from flatpak_builder_lint import checks, cli
+from flatpak_builder_lint import cli, fleet, server
 
 
 @pytest.fixture(scope="module")
@@ -25,9 +30,7 @@ def change_to_tmpdir(tmp_testdir: str) -> Generator[None, None, None]:
 
 
 def run_checks(filename: str, enable_exceptions: bool = False) -> dict:
-    checks.Check.errors = set()
-    checks.Check.warnings = set()
-    return cli.run_checks("manifest", filename, enable_exceptions)
+    return cli.run_checks("manifest", filename, cli.RunOptions(enable_exceptions=enable_exceptions))
 
 
 def test_appid_too_few_cpts() -> None:
@@ -338,3 +341,65 @@ def test_manifest_nightly_checker() -> None:
     }
     for e in errors:
         assert e in found_errors
+
+
+def test_manifest_batch() -> None:
+    tasks = [
+        ("manifest", "tests/manifests/toplevel.json"),
+        ("manifest", "tests/manifests/flathub_json.json"),
+        ("manifest", "tests/manifests/does-not-exist.json"),
+        ("appstream", "tests/manifests/toplevel.json"),
+    ]
+    entries = list(cli.run_batch(tasks))
+
+    assert [(e["kind"], e["path"]) for e in entries] == tasks
+    assert "toplevel-no-modules" in entries[0]["results"]["errors"]
+    assert "toplevel-no-modules" not in entries[1]["results"].get("errors", [])
+    assert "error" in entries[2]
+    assert "error" in entries[3]
+
+
+def test_manifest_fleet() -> None:
+    tasks = [
+        ("manifest", "tests/manifests/toplevel.json"),
+        ("manifest", "tests/manifests/flathub_json.json"),
+        ("manifest", "tests/manifests/modules.json"),
+    ]
+    entries = list(fleet.run_fleet(tasks, workers=2, timeout=300, max_tasks_per_worker=1))
+
+    assert sorted((e["kind"], e["path"]) for e in entries) == sorted(tasks)
+    assert sorted(entries, key=lambda e: e["path"]) == sorted(
+        cli.run_batch(tasks), key=lambda e: e["path"]
+    )
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str) -> None:
+        super().__init__("localhost")
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+def test_manifest_serve(tmp_testdir: str) -> None:
+    socket_path = os.path.join(tmp_testdir, "lint.sock")
+    threading.Thread(target=server.serve, args=(socket_path, 0), daemon=True).start()
+    for _ in range(50):
+        if os.path.exists(socket_path):
+            break
+        time.sleep(0.1)
+
+    conn = UnixHTTPConnection(socket_path)
+    request = {"kind": "manifest", "path": os.path.abspath("tests/manifests/toplevel.json")}
+    conn.request("POST", "/lint", json.dumps(request))
+    response = conn.getresponse()
+
+    assert response.status == 200
+    assert json.loads(response.read()) == run_checks("tests/manifests/toplevel.json")
+
+    conn.request("POST", "/lint", json.dumps({"kind": "appstream", "path": "foo.xml"}))
+    response = conn.getresponse()
+    assert response.status == 400
+    response.read()
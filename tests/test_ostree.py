@@ -0,0 +1,420 @@
+import gzip
+import json
+import os
+import pathlib
+import shutil
+import stat
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import cast
+
+import pytest
+
+gi = pytest.importorskip("gi")
+gi.require_version("OSTree", "1.0")
+from gi.repository import Gio, GLib, OSTree  # noqa: E402
+
+from flatpak_builder_lint import builddir, checks, cli, domainutils, ostree  # noqa: E402
+from flatpak_builder_lint.checks.finish_args import FinishArgsCheck  # noqa: E402
+from flatpak_builder_lint.checks.flathub_json import FlathubJsonCheck  # noqa: E402
+from flatpak_builder_lint.ostree import LintRepo  # noqa: E402
+
+APPID = "org.flathub.example"
+
+METADATA = f"""[Application]
+name={APPID}
+runtime=org.freedesktop.Platform/x86_64/24.08
+sdk=org.freedesktop.Sdk/x86_64/24.08
+command=example
+
+[Context]
+shared=network;
+sockets=x11;wayland;
+filesystems=home;
+
+[Session Bus Policy]
+org.freedesktop.Flatpak=talk
+"""
+
+FLATHUB_JSON = {"automerge-flathubbot-prs": True, "only-arches": []}
+
+
+def _write_tree(directory: pathlib.Path) -> pathlib.Path:
+    (directory / "files" / "bin").mkdir(parents=True)
+    (directory / "files" / "share" / "applications").mkdir(parents=True)
+    (directory / "files" / "share" / "empty").mkdir(parents=True)
+
+    (directory / "metadata").write_text(METADATA)
+    (directory / "files" / "flathub.json").write_text(json.dumps(FLATHUB_JSON))
+    (directory / "files" / "bin" / "example").write_bytes(b"#!/bin/sh\n" + os.urandom(1024))
+    (directory / "files" / "bin" / "example").chmod(0o755)
+    (directory / "files" / "share" / "applications" / f"{APPID}.desktop").write_text(
+        "[Desktop Entry]\nType=Application\n"
+    )
+    (directory / "files" / "bin" / "link").symlink_to("example")
+
+    return directory
+
+
+def _commit(
+    repo: OSTree.Repo, ref: str, tree: pathlib.Path, metadata: GLib.Variant | None = None
+) -> None:
+    repo.prepare_transaction(None)
+    mtree = OSTree.MutableTree.new()
+    repo.write_directory_to_mtree(Gio.File.new_for_path(str(tree)), mtree, None, None)
+    _, root = repo.write_mtree(mtree, None)
+    _, checksum = repo.write_commit(None, "Test", None, metadata, cast(OSTree.RepoFile, root), None)
+    repo.transaction_set_ref(None, ref, checksum)
+    repo.commit_transaction(None)
+
+
+def _create_repo(path: pathlib.Path) -> OSTree.Repo:
+    repo = OSTree.Repo.new(Gio.File.new_for_path(str(path)))
+    repo.create(OSTree.RepoMode.ARCHIVE_Z2, None)
+    return repo
+
+
+@pytest.fixture
+def make_repo(tmp_path: pathlib.Path) -> Callable[[list[str], bool], str]:
+    def make(refs: list[str], xa_metadata: bool) -> str:
+        tree = _write_tree(tmp_path / "tree")
+        repo = _create_repo(tmp_path / "repo")
+
+        commit_metadata = None
+        if xa_metadata:
+            # As written by flatpak build-export, with a permission the
+            # metadata file of the tree lacks
+            xa = METADATA.replace("filesystems=home;\n", "filesystems=home;\ndevices=dri;\n")
+            commit_metadata = GLib.Variant("a{sv}", {"xa.metadata": GLib.Variant("s", xa)})
+
+        for ref in refs:
+            _commit(repo, ref, tree, commit_metadata)
+
+        return str(tmp_path / "repo")
+
+    return make
+
+
+def _checkout(repo_path: str, ref: str, dest: pathlib.Path) -> pathlib.Path:
+    dest.mkdir()
+    LintRepo(repo_path).extract_subpath(ref, "/", str(dest))
+    return dest
+
+
+def test_read_file_list_dir_stat_match_checkout(
+    make_repo: Callable[[list[str], bool], str], tmp_path: pathlib.Path
+) -> None:
+    ref = f"app/{APPID}/x86_64/stable"
+    repo_path = make_repo([ref], False)
+    checkout = _checkout(repo_path, ref, tmp_path / "checkout")
+    repo = LintRepo(repo_path)
+
+    for root, dirs, names in os.walk(checkout):
+        relroot = os.path.relpath(root, checkout).removeprefix(".")
+        prefix = f"{relroot}/" if relroot else ""
+        assert repo.list_dir(ref, relroot) == sorted(dirs + names)
+        for name in dirs + names:
+            path = os.path.join(root, name)
+            st = os.lstat(path)
+            repo_st = repo.stat(ref, prefix + name)
+            assert stat.S_IFMT(repo_st.mode) == stat.S_IFMT(st.st_mode)
+            if stat.S_ISREG(st.st_mode):
+                assert stat.S_IMODE(repo_st.mode) == stat.S_IMODE(st.st_mode)
+                assert repo_st.size == st.st_size
+                with open(path, "rb") as f:
+                    assert repo.read_file(ref, prefix + name) == f.read()
+
+    assert repo.list_dir(ref, "files/share/empty") == []
+
+    with pytest.raises(FileNotFoundError):
+        repo.read_file(ref, "files/missing")
+    with pytest.raises(FileNotFoundError):
+        repo.stat(ref, "files/missing")
+    with pytest.raises(FileNotFoundError):
+        repo.list_dir(ref, "files/missing")
+    with pytest.raises(FileNotFoundError):
+        repo.read_file(f"app/{APPID}/aarch64/stable", "metadata")
+
+
+def test_list_tree_matches_checkout(
+    make_repo: Callable[[list[str], bool], str], tmp_path: pathlib.Path
+) -> None:
+    refs = [f"app/{APPID}/x86_64/stable", f"app/{APPID}/aarch64/stable"]
+    repo_path = make_repo(refs, False)
+    checkout = _checkout(repo_path, refs[0], tmp_path / "checkout")
+    repo = LintRepo(repo_path)
+
+    files = {
+        os.path.relpath(os.path.join(root, name), checkout)
+        for root, _, names in os.walk(checkout)
+        for name in names
+    }
+    tree = repo.list_tree(refs[0])
+    assert set(tree) == files
+
+    # Refs of the same tree share the walk
+    assert repo.tree_checksum(refs[0]) == repo.tree_checksum(refs[1])
+    assert repo.list_tree(refs[1]) is tree
+
+    (tmp_path / "tree" / "files" / "bin" / "example").write_bytes(b"changed")
+    ostree_repo = OSTree.Repo.new(Gio.File.new_for_path(repo_path))
+    ostree_repo.open(None)
+    _commit(ostree_repo, refs[1], tmp_path / "tree")
+    changed = LintRepo(repo_path).list_tree(refs[1])
+    assert {path for path in tree if changed[path] != tree[path]} == {"files/bin/example"}
+
+
+@pytest.mark.parametrize("xa_metadata", [True, False])
+def test_read_metadata(make_repo: Callable[[list[str], bool], str], xa_metadata: bool) -> None:
+    ref = f"app/{APPID}/x86_64/stable"
+    repo = LintRepo(make_repo([ref], xa_metadata))
+
+    metadata = repo.read_metadata(ref)
+    assert metadata["name"] == APPID
+    assert metadata["permissions"]["socket"] == {"x11", "wayland"}
+    assert metadata["permissions"]["talk-name"] == {"org.freedesktop.Flatpak"}
+    assert ("dri" in metadata["permissions"]["device"]) is xa_metadata
+
+    # Without the commit metadata it is the metadata file of the tree
+    if not xa_metadata:
+        assert metadata == builddir.parse_metadata_bytes(repo.read_file(ref, "metadata"))
+
+    assert repo.load_commit(ref) is repo.load_commit(ref)
+
+
+def test_repo_checks_read_commit_metadata(tmp_path: pathlib.Path) -> None:
+    ref = f"app/{APPID}/x86_64/stable"
+    tree = _write_tree(tmp_path / "tree")
+    repo = _create_repo(tmp_path / "repo")
+    xa = METADATA.replace("sockets=x11;wayland;", "sockets=x11;wayland;session-bus;")
+    _commit(repo, ref, tree, GLib.Variant("a{sv}", {"xa.metadata": GLib.Variant("s", xa)}))
+
+    results = cli.run_checks(
+        "repo", str(tmp_path / "repo"), cli.RunOptions(only=("FinishArgsCheck",))
+    )
+    assert "finish-args-arbitrary-dbus-access" in cast(list, results["errors"])
+
+
+def test_primary_ref_is_deterministic(make_repo: Callable[[list[str], bool], str]) -> None:
+    refs = [
+        f"runtime/{APPID}.Locale/x86_64/stable",
+        f"app/{APPID}/x86_64/stable",
+        f"app/{APPID}/aarch64/stable",
+        "screenshots/x86_64",
+    ]
+    repo_path = make_repo(refs, False)
+
+    for _ in range(3):
+        assert LintRepo(repo_path).primary_ref() == f"app/{APPID}/aarch64/stable"
+
+
+@pytest.mark.parametrize("checkclass", [FinishArgsCheck, FlathubJsonCheck])
+def test_repo_checks_match_checkout(
+    make_repo: Callable[[list[str], bool], str],
+    tmp_path: pathlib.Path,
+    checkclass: type[FinishArgsCheck | FlathubJsonCheck],
+) -> None:
+    ref = f"app/{APPID}/x86_64/stable"
+    repo_path = make_repo([ref], False)
+    checkout = _checkout(repo_path, ref, tmp_path / "checkout")
+
+    repo_check = checkclass(checks.LintContext())
+    repo_check.check_repo(repo_path)
+    build_check = checkclass(checks.LintContext())
+    build_check.check_build(str(checkout))
+
+    assert repo_check.results.to_dict()
+    assert repo_check.results.to_dict() == build_check.results.to_dict()
+
+
+def test_snapshot_shared_between_threads(make_repo: Callable[[list[str], bool], str]) -> None:
+    refs = [f"app/{APPID}/x86_64/stable", f"app/{APPID}/aarch64/stable"]
+    repo = LintRepo(make_repo(refs, False))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        snapshots = list(executor.map(repo.snapshot, refs * 4))
+        contents = list(executor.map(lambda ref: repo.read_file(ref, "metadata"), refs * 4))
+
+    assert set(snapshots[::2]) == {snapshots[0]}
+    assert set(snapshots[1::2]) == {snapshots[1]}
+    assert snapshots[0] != snapshots[1]
+    assert os.listdir(os.path.join(snapshots[0], "applications")) == [f"{APPID}.desktop"]
+    assert set(contents) == {METADATA.encode()}
+
+    repo.close()
+    assert not os.path.exists(snapshots[0])
+
+
+def test_lint_all_arches(make_repo: Callable[[list[str], bool], str]) -> None:
+    arches = ["aarch64", "i386", "x86_64"]
+    refs = [f"app/{APPID}/{arch}/stable" for arch in arches]
+    repo_path = make_repo([*refs, f"app/{APPID}/x86_64/beta", "screenshots/x86_64"], False)
+    only = ("FinishArgsCheck", "FlathubJsonCheck")
+
+    events: list[dict] = []
+    results = cli.run_checks(
+        "repo", repo_path, cli.RunOptions(only=only, all_arches=True), on_event=events.append
+    )
+    single = cli.run_checks("repo", repo_path, cli.RunOptions(only=only), repo_primary_ref=refs[2])
+
+    assert isinstance(results["arches"], dict)
+    assert sorted(results["arches"]) == arches
+    assert all(arch_results == single for arch_results in results["arches"].values())
+    assert results["errors"] == single["errors"]
+    assert {(e["arch"], e["check"]) for e in events if e["event"] == "check"} == {
+        (arch, check) for arch in arches for check in only
+    }
+
+
+def test_lint_all_refs_exceptions_per_ref(
+    make_repo: Callable[[list[str], bool], str], tmp_path: pathlib.Path
+) -> None:
+    appids = ["org.flathub.excepted", "org.flathub.partly", "org.flathub.other"]
+    refs = [f"app/{appid}/x86_64/stable" for appid in appids]
+    repo_path = make_repo(refs, False)
+
+    # An extension without a [Context] group
+    extension = "org.freedesktop.LinuxAudio.Plugins.SoSynthLV2"
+    extension_ref = f"runtime/{extension}/x86_64/24.08"
+    (tmp_path / "extension" / "files").mkdir(parents=True)
+    (tmp_path / "extension" / "metadata").write_text(
+        f"[Runtime]\nname={extension}\n\n"
+        "[ExtensionOf]\nref=runtime/org.freedesktop.Platform/x86_64/24.08\n"
+    )
+    repo = OSTree.Repo.new(Gio.File.new_for_path(repo_path))
+    repo.open(None)
+    _commit(repo, extension_ref, tmp_path / "extension")
+
+    exceptions_path = tmp_path / "exceptions.json"
+    exceptions_path.write_text(
+        json.dumps({appids[0]: ["*"], appids[1]: ["finish-args-contains-both-x11-and-wayland"]})
+    )
+
+    options = cli.RunOptions(
+        enable_exceptions=True,
+        user_exceptions_path=str(exceptions_path),
+        only=("FinishArgsCheck",),
+        all_refs=True,
+    )
+    results = cli.run_checks("repo", repo_path, options)
+
+    assert isinstance(results["refs"], dict)
+    per_ref = results["refs"]
+    assert per_ref[refs[0]] == {}
+    assert per_ref[extension_ref] == {}
+    assert set(per_ref[refs[1]].get("errors", [])) == set(per_ref[refs[2]]["errors"]) - {
+        "finish-args-contains-both-x11-and-wayland"
+    }
+    assert "finish-args-contains-both-x11-and-wayland" in per_ref[refs[2]]["errors"]
+
+
+def test_screenshots_cached_until_screenshots_ref_changes(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(domainutils, "CACHEDIR", str(tmp_path / "cache"))
+    monkeypatch.delenv("FLAT_MANAGER_BUILD_ID", raising=False)
+
+    appid = "org.flathub.gui"
+    template = pathlib.Path(__file__).parent / "builddir" / "min_success_metadata" / appid
+    share = tmp_path / "tree" / "files" / "share"
+    (share / "metainfo").mkdir(parents=True)
+    (share / "app-info" / "xmls").mkdir(parents=True)
+    shutil.copy(template / "metadata", tmp_path / "tree")
+    shutil.copy(template / f"{appid}.appdata.xml", share / "metainfo")
+    with gzip.open(share / "app-info" / "xmls" / f"{appid}.xml.gz", "wb") as f:
+        f.write((template / f"{appid}.xml").read_bytes())
+
+    screenshots = tmp_path / "screenshots"
+    screenshots.mkdir()
+    (screenshots / "org.flathub.example.gui-5b97a2051866698942c536e94169b6a8.png").touch()
+
+    repo = _create_repo(tmp_path / "repo")
+    _commit(repo, f"app/{appid}/x86_64/stable", tmp_path / "tree")
+    _commit(repo, "screenshots/x86_64", screenshots)
+
+    def lint() -> tuple[dict, list[dict]]:
+        events: list[dict] = []
+        results = cli.run_checks(
+            "repo",
+            str(tmp_path / "repo"),
+            cli.RunOptions(only=("ScreenshotsCheck",), use_cache=True),
+            on_event=events.append,
+        )
+        return results, [e for e in events if e["event"] == "check"]
+
+    results, events = lint()
+    assert "errors" not in results
+    results, events = lint()
+    assert events == [{"event": "check", "check": "ScreenshotsCheck", "cached": True}]
+
+    # Same app commit, the screenshots were not mirrored this time
+    shutil.rmtree(screenshots)
+    (screenshots / "other").mkdir(parents=True)
+    _commit(repo, "screenshots/x86_64", screenshots)
+
+    results, events = lint()
+    assert results["errors"] == ["appstream-screenshots-files-not-found-in-ostree"]
+    assert events == [{"event": "check", "check": "ScreenshotsCheck", "time": events[0]["time"]}]
+
+
+def test_ref_cache_serves_selected_checks(
+    make_repo: Callable[[list[str], bool], str],
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(domainutils, "CACHEDIR", str(tmp_path / "cache"))
+    monkeypatch.delenv("FLAT_MANAGER_BUILD_ID", raising=False)
+    repo_path = make_repo([f"app/{APPID}/x86_64/stable"], False)
+
+    def lint(only: tuple[str, ...], skip: tuple[str, ...] = ()) -> tuple[dict, dict[str, dict]]:
+        events: list[dict] = []
+        options = cli.RunOptions(only=only, skip=skip, use_cache=True)
+        results = cli.run_checks("repo", repo_path, options, on_event=events.append)
+        return results, {e["check"]: e for e in events if e["event"] == "check"}
+
+    only = ("FinishArgsCheck", "FlathubJsonCheck")
+    fresh, events = lint(only)
+    assert "flathub-json-automerge-enabled" in fresh["errors"]
+    assert not any(e.get("cached") for e in events.values())
+
+    cached, events = lint(only)
+    assert cached == fresh
+    assert all(events[name]["cached"] for name in only)
+
+    results, events = lint(only, skip=("FlathubJsonCheck",))
+    assert set(events) == {"FinishArgsCheck"}
+    assert events["FinishArgsCheck"]["cached"]
+    assert not any(e.startswith("flathub-json-") for e in results["errors"])
+
+    results, events = lint(("FlathubJsonCheck",))
+    assert set(events) == {"FlathubJsonCheck"}
+    assert all(e.startswith("flathub-json-") for e in results["errors"])
+
+
+def test_repo_opened_once_per_lint(
+    make_repo: Callable[[list[str], bool], str],
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    repo_path = make_repo([f"app/{APPID}/x86_64/stable"], False)
+    exceptions_path = tmp_path / "exceptions.json"
+    exceptions_path.write_text(json.dumps({APPID: ["finish-args-contains-both-x11-and-wayland"]}))
+
+    opened: list[str] = []
+    open_ostree_repo = ostree.open_ostree_repo
+
+    def counting_open(path: str) -> OSTree.Repo:
+        opened.append(path)
+        return open_ostree_repo(path)
+
+    monkeypatch.setattr(ostree, "open_ostree_repo", counting_open)
+
+    options = cli.RunOptions(
+        enable_exceptions=True,
+        user_exceptions_path=str(exceptions_path),
+        only=("FinishArgsCheck",),
+    )
+    results: dict = cli.run_checks("repo", repo_path, options)
+
+    assert "finish-args-contains-both-x11-and-wayland" not in results.get("errors", [])
+    assert opened == [repo_path]
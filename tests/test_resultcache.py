@@ -0,0 +1,104 @@
+import os
+import pathlib
+import time
+
+import pytest
+
+from flatpak_builder_lint import cli, domainutils, exceptions_matcher, resultcache
+
+
+@pytest.fixture(autouse=True)
+def cachedir(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(domainutils, "CACHEDIR", str(tmp_path / "cache"))
+    monkeypatch.delenv("FLAT_MANAGER_BUILD_ID", raising=False)
+
+
+def test_manifest_key_follows_included_files(tmp_path: pathlib.Path) -> None:
+    manifest = tmp_path / "org.example.App.json"
+    manifest.write_text('{"id": "org.example.App", "modules": ["modules/lib.json"]}')
+    (tmp_path / "modules").mkdir()
+    module = tmp_path / "modules" / "lib.yml"
+    (tmp_path / "modules" / "lib.json").write_text('{"name": "lib", "modules": ["lib.yml"]}')
+    module.write_text("name: nested")
+
+    key = resultcache.cache_key("manifest", str(manifest), {})
+    assert key == resultcache.cache_key("manifest", str(manifest), {})
+    assert key != resultcache.cache_key("manifest", str(manifest), {"exceptions": ["x"]})
+
+    module.write_text("name: changed")
+    changed_key = resultcache.cache_key("manifest", str(manifest), {})
+    assert key != changed_key
+
+    (tmp_path / "flathub.json").write_text('{"only-arches": ["x86_64"]}')
+    assert changed_key != resultcache.cache_key("manifest", str(manifest), {})
+
+
+def test_builddir_key_follows_share(tmp_path: pathlib.Path) -> None:
+    share = tmp_path / "files" / "share" / "applications"
+    share.mkdir(parents=True)
+    (tmp_path / "metadata").write_text("[Application]\nname=org.example.App\n")
+
+    key = resultcache.cache_key("builddir", str(tmp_path), {})
+    (share / "org.example.App.desktop").write_text("[Desktop Entry]\n")
+    assert key != resultcache.cache_key("builddir", str(tmp_path), {})
+
+
+def test_no_key_for_flat_manager_builds(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("FLAT_MANAGER_BUILD_ID", "1")
+    assert resultcache.cache_key("builddir", str(tmp_path), {}) is None
+
+
+def test_get_put_evict(monkeypatch: pytest.MonkeyPatch) -> None:
+    assert resultcache.get("ab" * 32) is None
+
+    resultcache.put("ab" * 32, {"errors": ["appid-not-defined"]})
+    assert resultcache.get("ab" * 32) == {"errors": ["appid-not-defined"]}
+
+    old = time.time() - resultcache.MAX_AGE - 1
+    os.utime(resultcache._entry_path("ab" * 32), (old, old))
+    assert resultcache.get("ab" * 32) is None
+
+    resultcache.put("cd" * 32, {"errors": ["appid-not-defined"]})
+    monkeypatch.setattr(resultcache, "MAX_SIZE", 1)
+    resultcache.evict(force=True)
+    assert not os.path.exists(resultcache._entry_path("ab" * 32))
+    assert not os.path.exists(resultcache._entry_path("cd" * 32))
+
+
+def test_ref_key_follows_commit_and_screenshots() -> None:
+    ref = "app/org.example.App/x86_64/stable"
+    refs = {ref: "a" * 64, "screenshots/x86_64": "c" * 64}
+    key = resultcache.ref_cache_key(ref, "a" * 64, refs)
+    assert key == resultcache.ref_cache_key(ref, "a" * 64, dict(refs))
+    assert key != resultcache.ref_cache_key(ref, "b" * 64, refs)
+    assert key != resultcache.ref_cache_key("app/org.example.App/aarch64/stable", "a" * 64, refs)
+
+    # ScreenshotsCheck looks at the screenshots of every arch
+    assert key != resultcache.ref_cache_key(ref, "a" * 64, {**refs, "screenshots/x86_64": "d" * 64})
+    assert key != resultcache.ref_cache_key(
+        ref, "a" * 64, {**refs, "app/org.example.App/aarch64/stable": "e" * 64}
+    )
+    assert key == resultcache.ref_cache_key(
+        ref, "a" * 64, {**refs, "app/org.example.App/x86_64/beta": "f" * 64}
+    )
+
+
+def test_ref_entry_only_serves_selected_checks(monkeypatch: pytest.MonkeyPatch) -> None:
+    key = resultcache.ref_cache_key("app/org.example.App/x86_64/stable", "a" * 64, {})
+    resultcache.put(key, {"MetainfoCheck": {"errors": ["appstream-metainfo-missing"]}})
+    monkeypatch.setattr(cli, "_ref_cache_key", lambda *_: key)
+
+    events: list[dict] = []
+    results = cli._lint(
+        "repo",
+        "repo",
+        exceptions_matcher.compile_exceptions(()),
+        cli.RunOptions(only=("NoSuchCheck",), skip=("MetainfoCheck",), use_cache=True),
+        on_event=events.append,
+    )
+
+    assert results == {}
+    assert events == []
+    assert resultcache.get(key) == {"MetainfoCheck": {"errors": ["appstream-metainfo-missing"]}}
@@ -0,0 +1,43 @@
+import argparse
+from collections.abc import Sequence
+
+from flatpak_builder_lint import exceptions_index
+
+SOURCE = "flatpak_builder_lint/staticfiles/exceptions.json"
+INDEX = "flatpak_builder_lint/staticfiles/exceptions.idx"
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Generate the index of exceptions.json looked up by the linter"
+    )
+    parser.add_argument(
+        "--check",
+        help="Do not write the index, fail if it is not the one of exceptions.json",
+        action="store_true",
+    )
+    args = parser.parse_args(argv)
+
+    with open(SOURCE, "rb") as f:
+        data = exceptions_index.build_from_json(f.read())
+
+    if not args.check:
+        with open(INDEX, "wb") as f:
+            f.write(data)
+        return 0
+
+    try:
+        with open(INDEX, "rb") as f:
+            current = f.read() == data
+    except FileNotFoundError:
+        current = False
+
+    if not current:
+        print(f"{INDEX} is out of date, run: python3 utils/exceptions_index.py")  # noqa: T201
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,111 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from collections.abc import Sequence
+
+HEAVY_MODULES = ("gi", "lxml", "jsonschema", "requests", "requests_cache", "sentry_sdk")
+
+# Python code run for every subcommand and the heavy modules it must
+# not import. The kinds only import the CLI and their checks since the
+# lint itself needs external tools.
+SUBCOMMANDS: dict[str, tuple[list[str], set[str]]] = {
+    "version": (
+        ["-m", "flatpak_builder_lint.cli", "--version"],
+        set(HEAVY_MODULES),
+    ),
+    "appstream": (
+        ["-c", "from flatpak_builder_lint import appstream, cli"],
+        set(HEAVY_MODULES),
+    ),
+    "manifest": (
+        ["-c", "from flatpak_builder_lint import checks, cli, manifest; checks.load('manifest')"],
+        {"gi", "lxml", "requests", "requests_cache", "sentry_sdk"},
+    ),
+    "builddir": (
+        ["-c", "from flatpak_builder_lint import builddir, checks, cli; checks.load('builddir')"],
+        {"jsonschema", "sentry_sdk"},
+    ),
+    "repo": (
+        ["-c", "from flatpak_builder_lint import checks, cli, ostree; checks.load('repo')"],
+        {"jsonschema", "sentry_sdk"},
+    ),
+}
+
+
+def parse_importtime(stderr: str) -> tuple[float, set[str]]:
+    total_us = 0
+    modules = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, _, name = line.removeprefix("import time:").split("|")
+        if not self_us.strip().isdigit():
+            continue
+        total_us += int(self_us)
+        modules.add(name.strip())
+    return total_us / 1000, modules
+
+
+def measure(args: list[str], repeat: int) -> tuple[float, set[str]]:
+    timings = []
+    modules: set[str] = set()
+    for _ in range(repeat):
+        ret = subprocess.run(
+            [sys.executable, "-X", "importtime", *args],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        total_ms, modules = parse_importtime(ret.stderr)
+        timings.append(total_ms)
+    return statistics.median(timings), modules
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure the import time of every subcommand")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per subcommand")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file written by a previous --output")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed relative slowdown against the baseline",
+    )
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    exit_code = 0
+    results = {}
+
+    for name, (cmd, forbidden) in SUBCOMMANDS.items():
+        total_ms, modules = measure(cmd, args.repeat)
+        heavy = sorted(m for m in HEAVY_MODULES if m in modules)
+        results[name] = {"import_ms": round(total_ms, 1), "heavy_modules": heavy}
+        print(f"{name:<10} {total_ms:8.1f} ms  {', '.join(heavy) or '-'}")  # noqa: T201
+
+        if unexpected := forbidden.intersection(heavy):
+            print(f"{name}: imports {', '.join(sorted(unexpected))}")  # noqa: T201
+            exit_code = 1
+
+        if name in baseline:
+            limit = baseline[name]["import_ms"] * (1 + args.tolerance)
+            if total_ms > limit:
+                print(f"{name}: {total_ms:.1f} ms is slower than the {limit:.1f} ms limit")  # noqa: T201
+                exit_code = 1
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())